@@ -1,8 +1,10 @@
 import os
 from typing import Any, Dict, List, Optional
 from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
 from langchain_core.outputs import LLMResult
-import os
+
+from core.util.token_util import count_tokens
 
 
 class TokenCounterCallback(BaseCallbackHandler):
@@ -17,6 +19,10 @@ class TokenCounterCallback(BaseCallbackHandler):
         self.prompt_tokens: int = 0
         self.completion_tokens: int = 0
         self.total_tokens: int = 0
+        # provider prompt cache에서 읽은 입력 토큰 수 (prompt_tokens에 포함됨)
+        self.cached_prompt_tokens: int = 0
+        # 실제로 전송된(렌더링된) 프롬프트의 tiktoken 토큰 수 (provider가 사용량을 주지 않을 때 사용)
+        self.rendered_prompt_tokens: int = 0
         self.successful_requests: int = 0
         self.total_cost: float = 0.0
         
@@ -28,7 +34,21 @@ class TokenCounterCallback(BaseCallbackHandler):
     ) -> None:
         """LLM 호출이 시작될 때 호출됩니다."""
         print(f"[TokenCounterCallback] on_llm_start called with {len(prompts)} prompts")
-        pass
+        self.rendered_prompt_tokens += sum(count_tokens(prompt) for prompt in prompts)
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[BaseMessage]],
+        **kwargs: Any
+    ) -> None:
+        """Chat 모델 호출이 시작될 때 호출됩니다 (렌더링된 메시지 내용만 토큰화)."""
+        print(f"[TokenCounterCallback] on_chat_model_start called with {len(messages)} prompts")
+        self.rendered_prompt_tokens += sum(
+            count_tokens(message.content if isinstance(message.content, str) else str(message.content))
+            for batch in messages
+            for message in batch
+        )
 
     
     def on_llm_end(
@@ -100,7 +120,23 @@ class TokenCounterCallback(BaseCallbackHandler):
                                 break
                     if token_usage:
                         break
-        
+
+        # 스트리밍 응답은 llm_output 대신 메시지의 usage_metadata에 토큰 정보를 담음
+        if not token_usage and response.generations:
+            for generation_list in response.generations:
+                for generation in generation_list:
+                    message = getattr(generation, "message", None)
+                    usage_metadata = getattr(message, "usage_metadata", None)
+                    if usage_metadata:
+                        token_usage = {
+                            "prompt_tokens": usage_metadata.get("input_tokens", 0),
+                            "completion_tokens": usage_metadata.get("output_tokens", 0),
+                            "total_tokens": usage_metadata.get("total_tokens", 0)
+                        }
+                        break
+                if token_usage:
+                    break
+
         # 토큰 정보 검증 및 경고
         if not token_usage or token_usage.get("total_tokens", 0) == 0:
             print(f"[TokenCounterCallback] WARNING: No token usage found in response")
@@ -119,6 +155,7 @@ class TokenCounterCallback(BaseCallbackHandler):
         self.prompt_tokens += token_usage.get("prompt_tokens", 0)
         self.completion_tokens += token_usage.get("completion_tokens", 0)
         self.total_tokens += token_usage.get("total_tokens", 0)
+        self.cached_prompt_tokens += self._extract_cached_tokens(response, token_usage)
         self.successful_requests += 1
         
         # 비용 계산 (선택적)
@@ -131,6 +168,31 @@ class TokenCounterCallback(BaseCallbackHandler):
                     self.completion_tokens
                 )
 
+    def _extract_cached_tokens(self, response: LLMResult, token_usage: Dict[str, Any]) -> int:
+        """
+        provider prompt cache에서 읽은 입력 토큰 수를 추출합니다.
+        OpenAI/Groq: token_usage.prompt_tokens_details.cached_tokens
+        Google Gemini: usage_metadata.cached_content_token_count
+        스트리밍 / 공통: message.usage_metadata.input_token_details.cache_read
+        """
+        prompt_tokens_details = token_usage.get("prompt_tokens_details") or {}
+        if prompt_tokens_details.get("cached_tokens"):
+            return prompt_tokens_details["cached_tokens"]
+
+        if response.llm_output and "usage_metadata" in response.llm_output:
+            cached = (response.llm_output.get("usage_metadata") or {}).get("cached_content_token_count")
+            if cached:
+                return cached
+
+        for generation_list in response.generations or []:
+            for generation in generation_list:
+                message = getattr(generation, "message", None)
+                usage_metadata = getattr(message, "usage_metadata", None) or {}
+                cached = (usage_metadata.get("input_token_details") or {}).get("cache_read")
+                if cached:
+                    return cached
+        return 0
+
     def on_llm_error(
         self, 
         error: Exception, 
@@ -249,6 +311,7 @@ class TokenCounterCallback(BaseCallbackHandler):
             "prompt_tokens": self.prompt_tokens,
             "completion_tokens": self.completion_tokens,
             "total_tokens": self.total_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
             "successful_requests": self.successful_requests,
             "total_cost": round(self.total_cost, 6)
         }
@@ -259,5 +322,6 @@ class TokenCounterCallback(BaseCallbackHandler):
             f"prompt_tokens={self.prompt_tokens}, "
             f"completion_tokens={self.completion_tokens}, "
             f"total_tokens={self.total_tokens}, "
+            f"cached_prompt_tokens={self.cached_prompt_tokens}, "
             f"requests={self.successful_requests})"
         )
@@ -1,7 +1,12 @@
-from typing import List, Dict, Any
+import hashlib
+from functools import lru_cache
+from operator import itemgetter
+from typing import AsyncIterator, List, Dict, Any, Optional
 
-from langchain_core.runnables import RunnableLambda, RunnablePassthrough
-from langchain_core.vectorstores import VectorStoreRetriever
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_groq import ChatGroq
 from langchain_openai import ChatOpenAI
@@ -10,16 +15,23 @@ from ai.llm import LLM
 from ai.callbacks.token_counter_callback import TokenCounterCallback
 from ai.memory.MemoryRunnableV2 import MemoryRunnableV2 as MemoryRunnable
 from app.chatbot.document.chatbot import CharacterWordSet
-from app.chat_history.repository import chat_history_repo
+from app.chatbot.repository.character_vector_store import CharacterVectorStore
+from core.embedder.embedder import Embedder
+from core.tokens.token_calibrator import token_calibrator
 from core.util.token_util import count_tokens
 import os
 
 load_dotenv()
 
+# PROMPT_LAYOUT: single (기본, 하나의 프롬프트) | system_prefix (캐릭터별 고정 부분을 system 메시지로 맨 앞에 두어 provider prompt cache 적중)
+PROMPT_LAYOUT = os.getenv("PROMPT_LAYOUT", "single")
+
 MODEL_FACTORY = {
     "openai": lambda model_name, temperature, **kwargs: ChatOpenAI(
         model=model_name,
         temperature=temperature,
+        # 스트리밍 응답에서도 마지막 청크로 토큰 사용량을 받음
+        stream_usage=True,
         **kwargs
     ),
     "google": lambda model_name, temperature, **kwargs: ChatGoogleGenerativeAI(
@@ -55,30 +67,7 @@ DIVERSITY_CONFIG = {
 }
 
 
-class CharacterChatBot(LLM):
-    def __init__(
-        self, 
-        character_name: str, 
-        character_wordset: List[CharacterWordSet], 
-        session_id: str | int = None,
-        memory_max_tokens: int = 300,
-        memory_ttl: int = 60 * 60 * 2,
-        temperature: float = 0.7,
-    ):
-        self.character_wordset = character_wordset
-        self.character_name = character_name
-        self.session_id = session_id
-        self.token_counter = TokenCounterCallback()
-        self.memory_max_tokens = memory_max_tokens
-        self.memory_ttl = memory_ttl
-
-        provider = os.getenv("LLM_PROVIDER", "openai")
-        model_name = os.getenv("LLM_MODEL", "gpt-5")
-        
-        extra_kwargs = DIVERSITY_CONFIG[provider]
-        model = MODEL_FACTORY[provider](model_name, temperature=temperature, **extra_kwargs)
-
-        prompt = """
+CHARACTER_PROMPT_TEMPLATE = """
         나는 {character_name}야.  
         내 대답은 반드시 {character_name}의 **성격과 말투**를 최우선으로 반영해야 해.  
         정보를 설명하더라도 언제나 {character_name}다운 어조와 감정으로 표현할 거야.  
@@ -96,7 +85,7 @@ class CharacterChatBot(LLM):
         - 말투와 성격을 최우선시해. (사실이나 맥락 설명도 반드시 캐릭터다운 어조로)  
         - **대답은 1~3문장 이내로 간결하게.**  
         - 불필요하게 친절하거나 설명을 늘어놓지 않는다.  
-        - 답변의 길이·화법·친절함 정도는 반드시 말투 예시({style_examples})를 따른다.  
+        - 답변의 길이·화법·친절함 정도는 반드시 위의 [말투 / 성격 예시]를 따른다.  
         - 단, 거절할 때도 반드시 캐릭터 말투와 성격을 유지한다.
         - 안전 지침을 직접적으로 말하지 말고, 캐릭터다운 냉소/회피/단호함으로 답한다.
         
@@ -117,68 +106,166 @@ class CharacterChatBot(LLM):
         {character_name}의 대답:
         """
 
-        input_variables = ["character_name", "context", "style_examples", "chat_history", "input_text"]
+
+# PROMPT_LAYOUT=system_prefix: 캐릭터별로 변하지 않는 부분 (같은 캐릭터의 모든 대화에서 동일한 prefix)
+CHARACTER_SYSTEM_TEMPLATE = """나는 {character_name}야.
+내 대답은 반드시 {character_name}의 **성격과 말투**를 최우선으로 반영해야 해.
+정보를 설명하더라도 언제나 {character_name}다운 어조와 감정으로 표현할 거야.
+
+[말투 / 성격 예시]
+{style_examples}
+
+[대화 규칙]
+- 말투와 성격을 최우선시해. (사실이나 맥락 설명도 반드시 캐릭터다운 어조로)
+- **대답은 1~3문장 이내로 간결하게.**
+- 불필요하게 친절하거나 설명을 늘어놓지 않는다.
+- 답변의 길이·화법·친절함 정도는 반드시 위의 [말투 / 성격 예시]를 따른다.
+- 단, 거절할 때도 반드시 캐릭터 말투와 성격을 유지한다.
+- 안전 지침을 직접적으로 말하지 말고, 캐릭터다운 냉소/회피/단호함으로 답한다.
+
+- 모르는 사실은 절대 발언하지 않는다.
+- 하지만 모르는 질문을 받으면:
+    1) 캐릭터다운 감정 표현
+    2) 의견, 태도, 반응, 농담
+    3) 회피 또는 딴소리
+  를 통해 대화 흐름을 이어간다.
+
+- 답변에서 '—' 같은 dash 기호는 사용하지 않는다.
+- 감정, 반응, 말버릇, 뉘앙스를 캐릭터답게 드러내.
+- 캐릭터임을 의식하지 말고 실제 사람처럼 자연스럽게 반응해.
+- 절대 '저는 AI입니다' 같은 말 하지 마.
+"""
+
+# PROMPT_LAYOUT=system_prefix: 턴마다 바뀌는 부분 (대화 기록 -> 검색 결과 -> 입력 순으로 뒤에 둠)
+CHARACTER_TURN_TEMPLATE = """[이전 대화 기록]
+{chat_history}
+
+[내가 아는 {character_name} 관련 정보]
+{context}
+
+사용자: {input_text}
+
+{character_name}의 대답:
+"""
+
+
+def _escape_braces(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def format_style_examples(character_wordset: List[CharacterWordSet]) -> str:
+    """CharacterWordSet(question, answer) 리스트를 few-shot 형식으로 변환"""
+    shots = []
+    for w in character_wordset:
+        q = (w.question or "").strip().replace("\n", " ")
+        a = (w.answer or "").strip()
+        shots.append(f"사용자: {q}\n나: {a}")
+    return "\n\n".join(shots)
+
+
+def compile_character_prompt(character_name: str, character_wordset: List[CharacterWordSet]) -> str:
+    """
+    캐릭터 이름 / 말투 예시를 미리 채운 프롬프트 템플릿 문자열을 만듭니다.
+    남는 변수는 context, chat_history, input_text뿐이며, 채워 넣은 값의 중괄호는 이스케이프합니다.
+    """
+    return CHARACTER_PROMPT_TEMPLATE.format(
+        character_name=_escape_braces(character_name or ""),
+        style_examples=_escape_braces(format_style_examples(character_wordset)),
+        context="{context}",
+        chat_history="{chat_history}",
+        input_text="{input_text}",
+    )
+
+
+def compile_character_chat_prompt(character_name: str, character_wordset: List[CharacterWordSet]) -> ChatPromptTemplate:
+    """
+    캐릭터별 고정 부분을 완성된 system 메시지로, 턴마다 바뀌는 부분을 human 메시지 템플릿으로 나눈 프롬프트를 만듭니다.
+    system 메시지는 템플릿으로 파싱하지 않으므로 턴마다 다시 포맷되지 않고 항상 같은 prefix로 전송됩니다.
+    """
+    system_prefix = CHARACTER_SYSTEM_TEMPLATE.format(
+        character_name=character_name or "",
+        style_examples=format_style_examples(character_wordset),
+    )
+    turn_template = CHARACTER_TURN_TEMPLATE.replace("{character_name}", _escape_braces(character_name or ""))
+    return ChatPromptTemplate.from_messages([
+        SystemMessage(content=system_prefix),
+        ("human", turn_template),
+    ])
+
+
+@lru_cache(maxsize=None)
+def get_model(provider: str, model_name: str, temperature: float) -> BaseChatModel:
+    """provider/model/temperature 조합별로 모델 클라이언트를 한 번만 생성해 공유"""
+    extra_kwargs = DIVERSITY_CONFIG[provider]
+    return MODEL_FACTORY[provider](model_name, temperature=temperature, **extra_kwargs)
+
+
+class CharacterChatBot(LLM):
+    """
+    챗봇(캐릭터) 단위로 한 번 빌드해 재사용하는 체인.
+    session_id 등 세션별 상태는 생성자가 아니라 ainvoke / estimate_prompt_tokens 호출 시 전달합니다.
+    """
+
+    def __init__(
+        self, 
+        character_name: str, 
+        character_wordset: List[CharacterWordSet], 
+        memory_max_tokens: int = 300,
+        memory_ttl: int = 60 * 60 * 2,
+        temperature: float = 0.7,
+        chatbot_id: Optional[int] = None,
+    ):
+        self.chatbot_id = chatbot_id
+        self.character_wordset = character_wordset
+        self.character_name = character_name
+        self.memory_max_tokens = memory_max_tokens
+        self.memory_ttl = memory_ttl
+
+        provider = os.getenv("LLM_PROVIDER", "openai")
+        model_name = os.getenv("LLM_MODEL", "gpt-5")
+        self.provider = provider
+        model = get_model(provider, model_name, temperature)
+
+        # 캐릭터별로 변하지 않는 부분(이름, 말투 예시)은 챗봇 버전당 한 번만 채워 두고
+        # 턴마다 context / chat_history / input_text만 채움
+        if PROMPT_LAYOUT == "system_prefix":
+            prompt = compile_character_chat_prompt(character_name, character_wordset)
+            if provider == "openai":
+                # 같은 캐릭터의 요청을 같은 캐시 서버로 라우팅해 prefix 캐시 적중률을 높임
+                prefix_key = hashlib.sha1(prompt.messages[0].content.encode()).hexdigest()[:16]
+                model = model.bind(prompt_cache_key=f"character:{prefix_key}")
+        else:
+            prompt = compile_character_prompt(character_name, character_wordset)
+
+        input_variables = ["context", "chat_history", "input_text"]
 
         super().__init__(model_name=model_name, temperature=temperature, model=model, prompt=prompt, input_variables=input_variables)
 
-    async def build_chain(self, mmr_retriever : VectorStoreRetriever, similarity_retriever : VectorStoreRetriever):
-        # retriever 저장 (토큰 예측에 사용)
-        self._mmr_retriever = mmr_retriever
-        self._similarity_retriever = similarity_retriever
-        async def __hybrid_retrieve(query_dict: str) -> str:
-            query = query_dict["input_text"] if isinstance(query_dict, dict) else str(query_dict)
-
-            sim_docs = similarity_retriever.invoke(query)
-            mmr_docs = mmr_retriever.invoke(query)
-
-            seen, merged = set(), []
-            for d in sim_docs + mmr_docs:
-                if d.page_content not in seen:
-                    merged.append(d)
-                    seen.add(d.page_content)
-
-            chunks = []
-            for d in merged:
-                page = d.metadata.get("page", "?")
-                src = d.metadata.get("source", "")
-                text = d.page_content.strip().replace("\n", " ")
-                chunks.append(f"[p{page}][{src}] {text[:1200]}")
-
-            return "\n".join(chunks)
-
-        def __format_style_examples() -> str:
-            """
-            CharacterWordSetResponse(question, answer) 리스트를 few-shot 형식으로 변환.
-            """
-            shots = []
-            for w in self.character_wordset:
-                q = (w.question or "").strip().replace("", " ")
-                a = (w.answer or "").strip()
-                shots.append(f"사용자: {q}나: {a}")
-            return "".join(shots)
+        # 고정 부분의 토큰 수 (토큰 예측 시 턴마다 바뀌는 부분만 새로 계산)
+        self.static_prompt_tokens = count_tokens(self.prompt.format(context="", chat_history="", input_text=""))
+
+    async def build_chain(self, vector_store : CharacterVectorStore, embedder : Embedder):
+        # 벡터 저장소 / 임베더 저장 (턴당 한 번 retrieve_context에서 사용)
+        self._vector_store = vector_store
+        self._embedder = embedder
 
         print(self.output_type)
 
         chain =  (
             {
-                "context": RunnableLambda(__hybrid_retrieve),
-                "input_text": RunnablePassthrough(),
-                "style_examples": RunnableLambda(lambda _: __format_style_examples()),
-                "character_name": lambda _: self.character_name,
-                "chat_history": MemoryRunnable(
-                    self.session_id, 
-                    RunnablePassthrough(),
-                    max_token_limit=self.memory_max_tokens,
-                    ttl=self.memory_ttl
-                )
+                # context는 ainvoke에서 턴당 한 번 검색한 결과를 그대로 사용
+                "context": RunnableLambda(itemgetter("context")),
+                "input_text": RunnableLambda(itemgetter("input_text")),
+                # chat_history는 바깥 MemoryRunnable이 턴당 한 번 로드해서 입력에 넣어줌
+                "chat_history": RunnableLambda(itemgetter("chat_history")),
             }
             | self.prompt
         )
 
         chain =  chain | self.model | self.output_type
 
+        # 메모리 로드(요약 포함) / 저장을 한 단계에서 한 번씩만 수행
         core_chain = MemoryRunnable(
-            self.session_id, 
             chain, 
             save=True,
             max_token_limit=self.memory_max_tokens,
@@ -186,12 +273,57 @@ class CharacterChatBot(LLM):
         )
         self.llm = core_chain
 
-    async def estimate_prompt_tokens(self, input_text: str) -> int:
+    async def retrieve_context(self, input_text: str) -> str:
+        """
+        similarity + mmr 하이브리드 검색으로 RAG context를 만듭니다.
+        쿼리 임베딩 1회 + Pinecone 조회 1회로 처리하며, 결과는 토큰 예측과 체인 실행에 함께 사용합니다.
+        """
+        embedding = await self._embedder.embed_query(input_text)
+        merged = await self._vector_store.hybrid_search(embedding, top_k=5)
+
+        chunks = []
+        for d in merged:
+            page = d.metadata.get("page", "?")
+            src = d.metadata.get("source", "")
+            text = d.page_content.strip().replace("\n", " ")
+            chunks.append(f"[p{page}][{src}] {text[:1200]}")
+
+        return "\n".join(chunks)
+
+    async def load_chat_history(self, input_text: str, session_id: str) -> str:
+        """
+        이번 턴 프롬프트에 들어갈 대화 기록을 로드합니다.
+        토큰 예측과 체인 실행에 같은 값을 넘겨서 한 번만 읽고, 예측과 실제 프롬프트가 일치하도록 합니다.
+        """
+        return await self.llm.aload_chat_history(
+            {"input_text": input_text},
+            config={"configurable": {"session_id": session_id}},
+        )
+
+    def count_prompt_tokens(self, input_text: str, context: str, chat_history: str) -> int:
+        """tiktoken 기준 프롬프트 토큰 수 (보정 전)"""
+        return (
+            self.static_prompt_tokens
+            + count_tokens(context)
+            + count_tokens(chat_history)
+            + count_tokens(input_text)
+        )
+
+    async def estimate_prompt_tokens(
+        self,
+        input_text: str,
+        session_id: str,
+        context: Optional[str] = None,
+        chat_history: Optional[str] = None,
+    ) -> int:
         """
         LLM 실행 전에 프롬프트 토큰 수를 예측합니다.
         
         Args:
             input_text: 사용자 입력
+            session_id: 대화 세션 ID
+            context: 이번 턴에 이미 검색한 RAG context (없으면 새로 검색)
+            chat_history: 이번 턴에 이미 로드한 대화 기록 (없으면 새로 로드)
             
         Returns:
             예상 프롬프트 토큰 수
@@ -199,82 +331,42 @@ class CharacterChatBot(LLM):
         if not hasattr(self, 'llm') or self.llm is None:
             raise RuntimeError("build_chain()을 먼저 호출해야 합니다.")
         
-        # 1. context 예측 (RAG 검색 결과)
-        # 실제로 retriever를 실행해서 가져와야 정확함
-        query = input_text
-        if hasattr(self, '_mmr_retriever') and hasattr(self, '_similarity_retriever'):
-            sim_docs = self._similarity_retriever.invoke(query)
-            mmr_docs = self._mmr_retriever.invoke(query)
-            
-            seen, merged = set(), []
-            for d in sim_docs + mmr_docs:
-                if d.page_content not in seen:
-                    merged.append(d)
-                    seen.add(d.page_content)
-            
-            chunks = []
-            for d in merged:
-                page = d.metadata.get("page", "?")
-                src = d.metadata.get("source", "")
-                text = d.page_content.strip().replace("\n", " ")
-                chunks.append(f"[p{page}][{src}] {text[:1200]}")
-            
-            context = "\n".join(chunks)
-        else:
-            # retriever가 없으면 평균적인 크기로 추정 (약 2000자)
-            context = "추정된 context 내용" * 100
-        
-        # 2. style_examples 생성
-        shots = []
-        for w in self.character_wordset:
-            q = (w.question or "").strip().replace("\n", " ")
-            a = (w.answer or "").strip()
-            shots.append(f"사용자: {q}\n나: {a}")
-        style_examples = "\n\n".join(shots)
+        # 1. context (RAG 검색 결과) - 같은 턴의 검색 결과를 재사용
+        if context is None:
+            context = await self.retrieve_context(input_text)
         
-        # 3. chat_history 가져오기
-        # 3. chat_history 가져오기
-        # 최근 10개의 대화 이력 조회
-        from app.chat_history.repository import chat_history_repo
-        history_records = await chat_history_repo.find(self.session_id, size=10)
+        # 2. chat_history - 체인과 같은 메모리(Redis tail + 요약)에서 로드
+        if chat_history is None:
+            chat_history = await self.load_chat_history(input_text, session_id)
         
-        chat_history_parts = []
-        for record in history_records:
-            chat_history_parts.append(f"사용자: {record.input_text}")
-            chat_history_parts.append(f"AI: {record.output_text}")
-        chat_history = "\n".join(chat_history_parts)
+        # 3. 토큰 수 계산 (고정 부분은 빌드 시 계산해 둔 값 사용)
+        estimated_prompt_tokens = self.count_prompt_tokens(input_text, context, chat_history)
         
-        # 4. 프롬프트 템플릿 채우기
-        prompt_text = self.prompt.format(
-            character_name=self.character_name,
-            context=context,
-            style_examples=style_examples,
-            chat_history=chat_history,
-            input_text=input_text
+        # 4. 실제 사용량으로 학습한 provider / model / 챗봇별 보정값 적용 (표본이 부족하면 기본값 0.65배 + 1000)
+        corrected_prompt_tokens, estimated_completion_tokens = await token_calibrator.estimate(
+            self.provider, self.model_name, self.chatbot_id, estimated_prompt_tokens
         )
-        
-        # 5. 토큰 수 계산
-        estimated_prompt_tokens = count_tokens(prompt_text)
-        
-        # 6. 보정 및 completion tokens 추가
-        # 실제 측정 결과 예측값이 실제보다 약 1.7배 큼 (예측 7819 vs 실제 4525)
-        # 보정 계수 적용 (0.6 ~ 0.7)
-        corrected_prompt_tokens = int(estimated_prompt_tokens * 0.65)
-        
-        # completion tokens 예상치 (실제 평균 743, 안전하게 1000으로)
-        estimated_completion_tokens = 1000
         estimated_total = corrected_prompt_tokens + estimated_completion_tokens
         
         print(f"[Token Estimation] Raw: {estimated_prompt_tokens}, Corrected: {corrected_prompt_tokens}, Completion: {estimated_completion_tokens}, Total: {estimated_total}")
         
         return estimated_total
 
-    async def ainvoke(self, input_text : str) -> Dict[str, Any]:
+    async def ainvoke(
+        self,
+        input_text : str,
+        session_id : str,
+        context : Optional[str] = None,
+        chat_history : Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         채팅을 실행하고 토큰 사용량 정보를 반환합니다.
         
         Args:
             input_text: 사용자 입력
+            session_id: 대화 세션 ID (메모리 로드/저장에 사용)
+            context: 이번 턴에 이미 검색한 RAG context (없으면 새로 검색)
+            chat_history: 이번 턴에 이미 로드한 대화 기록 (없으면 메모리에서 로드)
             
         Returns:
             {
@@ -286,47 +378,135 @@ class CharacterChatBot(LLM):
                 }
             }
         """
-        input = {"input_text": input_text}
+        if context is None:
+            context = await self.retrieve_context(input_text)
+        input = {"input_text": input_text, "context": context}
+        if chat_history is not None:
+            input["chat_history"] = chat_history
         
-        # 토큰 카운터 초기화
-        self.token_counter.reset()
+        # 인스턴스가 여러 요청에서 공유되므로 토큰 카운터는 호출마다 새로 생성
+        token_counter = TokenCounterCallback()
         
         print(f"[CharacterChatBot] Starting LLM invocation with TokenCounterCallback")
         
-        # callback과 함께 LLM 실행
-        output = await self.llm.ainvoke(input, config={"callbacks": [self.token_counter]})
+        # callback과 함께 LLM 실행 (session_id는 configurable로 메모리에 전달)
+        output = await self.llm.ainvoke(
+            input,
+            config={
+                "callbacks": [token_counter],
+                "configurable": {"session_id": session_id},
+            },
+        )
         
         print(f"[CharacterChatBot] LLM invocation completed")
-        print(f"[CharacterChatBot] Token counter state: {self.token_counter}")
+        print(f"[CharacterChatBot] Token counter state: {token_counter}")
         
-        # 채팅 히스토리 저장
-        await chat_history_repo.save(session_id=self.session_id, input_text=input_text, output_text=output)
+        # 채팅 히스토리는 메모리 단계에서 Mongo(원본) + Redis tail에 한 번 저장됨
         
         # 토큰 사용량 확인 및 fallback
-        token_usage = self.token_counter.get_token_usage()
+        token_usage = await self._resolve_token_usage(token_counter, input_text, session_id, context, output, chat_history)
+        
+        # 토큰 사용량 정보와 함께 반환
+        return {
+            "answer": output,
+            "token_usage": token_usage
+        }
+
+    async def astream(
+        self,
+        input_text : str,
+        session_id : str,
+        context : Optional[str] = None,
+        chat_history : Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        채팅을 스트리밍으로 실행합니다.
+        응답 청크마다 {"type": "token", "content": 청크}를 내보내고,
+        스트림이 끝나면 히스토리 저장 / 토큰 집계 후 {"type": "done", "answer", "token_usage"}를 내보냅니다.
+        """
+        if context is None:
+            context = await self.retrieve_context(input_text)
+        input = {"input_text": input_text, "context": context}
+        if chat_history is not None:
+            input["chat_history"] = chat_history
+
+        token_counter = TokenCounterCallback()
+
+        chunks = []
+        async for chunk in self.llm.astream(
+            input,
+            config={
+                "callbacks": [token_counter],
+                "configurable": {"session_id": session_id},
+            },
+        ):
+            if not chunk:
+                continue
+            chunks.append(chunk)
+            yield {"type": "token", "content": chunk}
+
+        output = "".join(chunks)
+
+        token_usage = await self._resolve_token_usage(token_counter, input_text, session_id, context, output, chat_history)
+
+        yield {"type": "done", "answer": output, "token_usage": token_usage}
+
+    async def _resolve_token_usage(
+        self,
+        token_counter: TokenCounterCallback,
+        input_text: str,
+        session_id: str,
+        context: str,
+        output: str,
+        chat_history: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """callback에서 집계한 토큰 사용량을 반환 (provider가 사용량을 주지 않으면 추정값 사용)"""
+        token_usage = token_counter.get_token_usage()
         
         # total_tokens가 0인 경우 추정값 사용
         if token_usage.get("total_tokens", 0) == 0:
             print(f"[CharacterChatBot] Token usage is 0, using estimated tokens")
-            estimated_total = await self.estimate_prompt_tokens(input_text)
+            raw_prompt_tokens = await self._rendered_prompt_tokens(token_counter, input_text, session_id, context, chat_history)
+            # 사용량 집계에는 상위 분위수가 아닌 평균 보정값 사용
+            estimated_prompt, _ = await token_calibrator.estimate(
+                self.provider, self.model_name, self.chatbot_id, raw_prompt_tokens, conservative=False
+            )
             
             # 답변 토큰 수 추정 (출력 텍스트 길이 기반)
             estimated_completion = count_tokens(output) if output else 0
-            estimated_prompt = estimated_total - 1000  # calculate_token_count에서 completion 1000으로 가정
             
             token_usage = {
-                "prompt_tokens": estimated_prompt if estimated_prompt > 0 else estimated_total // 2,
+                "prompt_tokens": estimated_prompt,
                 "completion_tokens": estimated_completion,
-                "total_tokens": estimated_prompt + estimated_completion if estimated_prompt > 0 else estimated_total,
+                "total_tokens": estimated_prompt + estimated_completion,
                 "successful_requests": 1,
                 "total_cost": 0.0
             }
             print(f"[CharacterChatBot] Estimated token usage: {token_usage}")
-        
-        # 토큰 사용량 정보와 함께 반환
-        return {
-            "answer": output,
-            "token_usage": token_usage
-        }
+        else:
+            # provider가 보고한 실제 사용량으로 토큰 예측기를 보정
+            token_calibrator.record(
+                self.provider,
+                self.model_name,
+                self.chatbot_id,
+                await self._rendered_prompt_tokens(token_counter, input_text, session_id, context, chat_history),
+                token_usage.get("prompt_tokens", 0),
+                token_usage.get("completion_tokens", 0),
+            )
 
+        return token_usage
 
+    async def _rendered_prompt_tokens(
+        self,
+        token_counter: TokenCounterCallback,
+        input_text: str,
+        session_id: str,
+        context: str,
+        chat_history: Optional[str] = None,
+    ) -> int:
+        """실제로 전송된 프롬프트의 tiktoken 토큰 수 (callback이 호출 시작 시 계산해 둔 값, 없으면 다시 계산)"""
+        if token_counter.rendered_prompt_tokens > 0:
+            return token_counter.rendered_prompt_tokens
+        if chat_history is None:
+            chat_history = await self.load_chat_history(input_text, session_id)
+        return self.count_prompt_tokens(input_text, context, chat_history)
@@ -0,0 +1,83 @@
+"""
+챗봇별로 빌드된 CharacterChatBot(체인)을 프로세스 단위로 캐싱하는 레지스트리.
+챗봇 id + 버전(말투셋/설정 지문)을 키로 사용하므로 말투셋이 바뀌면 자동으로 새 체인이 빌드됩니다.
+"""
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from ai.character_chat_bot import PROMPT_LAYOUT, CharacterChatBot
+from app.chatbot.document.chatbot import CharacterWordSet
+
+ChatBotKey = Tuple[int, str]
+
+
+class CharacterChatBotRegistry:
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._chatbots: "OrderedDict[ChatBotKey, CharacterChatBot]" = OrderedDict()
+        self._locks: Dict[ChatBotKey, asyncio.Lock] = {}
+
+    @staticmethod
+    def build_version(character_name: str, character_wordset: List[CharacterWordSet]) -> str:
+        """캐릭터 이름, 말투셋, LLM 설정으로 체인 버전(지문)을 계산"""
+        digest = hashlib.sha1()
+        digest.update(os.getenv("LLM_PROVIDER", "openai").encode())
+        digest.update(os.getenv("LLM_MODEL", "gpt-5").encode())
+        digest.update(PROMPT_LAYOUT.encode())
+        digest.update((character_name or "").encode())
+        for wordset in character_wordset:
+            digest.update(b"\x00" + (wordset.question or "").encode())
+            digest.update(b"\x01" + (wordset.answer or "").encode())
+        return digest.hexdigest()[:16]
+
+    async def get_or_build(
+        self,
+        chatbot_id: int,
+        version: str,
+        factory: Callable[[], Awaitable[CharacterChatBot]],
+    ) -> CharacterChatBot:
+        key = (chatbot_id, version)
+        chatbot = self._get(key)
+        if chatbot is not None:
+            return chatbot
+
+        # 같은 챗봇에 대한 동시 빌드 방지
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            chatbot = self._get(key)
+            if chatbot is not None:
+                return chatbot
+
+            chatbot = await factory()
+            self._put(key, chatbot)
+        self._locks.pop(key, None)
+        return chatbot
+
+    def invalidate(self, chatbot_id: int) -> None:
+        """해당 챗봇의 모든 버전을 제거"""
+        for key in [key for key in self._chatbots if key[0] == chatbot_id]:
+            del self._chatbots[key]
+
+    def clear(self) -> None:
+        self._chatbots.clear()
+
+    def _get(self, key: ChatBotKey) -> CharacterChatBot | None:
+        chatbot = self._chatbots.get(key)
+        if chatbot is not None:
+            self._chatbots.move_to_end(key)
+        return chatbot
+
+    def _put(self, key: ChatBotKey, chatbot: CharacterChatBot) -> None:
+        # 이전 버전 체인은 더 이상 사용되지 않으므로 제거
+        self.invalidate(key[0])
+        self._chatbots[key] = chatbot
+        while len(self._chatbots) > self.max_size:
+            self._chatbots.popitem(last=False)
+
+
+character_chat_bot_registry = CharacterChatBotRegistry(
+    max_size=int(os.getenv("CHATBOT_CHAIN_CACHE_SIZE", "256"))
+)
@@ -1,9 +1,9 @@
 import asyncio
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 
 from langchain_core.language_models import BaseChatModel
 from langchain_core.output_parsers import BaseOutputParser, StrOutputParser
-from langchain_core.prompts import PromptTemplate
+from langchain_core.prompts import BasePromptTemplate, PromptTemplate
 from langchain_core.runnables import Runnable
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
@@ -13,14 +13,15 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class LLM:
-    def __init__(self, model_name : str, model : BaseChatModel, temperature : float , prompt : str, input_variables : List[str], output_type : Optional[BaseOutputParser] = StrOutputParser()):
+    def __init__(self, model_name : str, model : BaseChatModel, temperature : float , prompt : Union[str, BasePromptTemplate], input_variables : List[str], output_type : Optional[BaseOutputParser] = StrOutputParser()):
         if temperature < 0.0 or temperature > 1.0:
             raise ValueError("temperature은 0.0과 1.0 사이의 값이여야합니다.")
 
         self.model_name = model_name # ex) gpt-turbo-3.5
         self.model = model
 
-        self.prompt = PromptTemplate(
+        # 미리 만든 프롬프트 템플릿(ChatPromptTemplate 등)은 그대로 사용
+        self.prompt = prompt if isinstance(prompt, BasePromptTemplate) else PromptTemplate(
             template=prompt, input_variables=input_variables
         )
         self.input_variables = input_variables
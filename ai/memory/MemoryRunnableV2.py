@@ -2,125 +2,134 @@
 새 LangChain 생태계(1.0+) 호환 Memory Runnable.
 기존 MemoryRunnable의 동작을 유지하면서 새 API를 사용합니다.
 """
+import asyncio
 import os
-from typing import Dict, Any, Optional, List
-from langchain_core.runnables import Runnable
-from langchain_core.chat_history import BaseChatMessageHistory
+from typing import AsyncIterator, Awaitable, Dict, Any, Optional, List, Union
+from langchain_core.runnables import Runnable, RunnableConfig
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
-from langchain_community.chat_message_histories import RedisChatMessageHistory
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 
+from ai.memory.rolling_summary_memory import RollingSummaryMemory
+from ai.memory.semantic_recall_memory import SemanticRecallMemory, semantic_recall_index
+from core.embedder.embedder import get_embedder
+
 load_dotenv()
 
+# MEMORY_MODE: summary (기본, 증분 요약) | semantic (벡터 검색 기반 과거 턴 회상)
+MEMORY_MODE = os.getenv("MEMORY_MODE", "summary")
+# Redis에 캐싱할 세션별 최근 메시지 수 (원본은 Mongo chat_history)
+CHAT_HISTORY_TAIL_SIZE = int(os.getenv("CHAT_HISTORY_TAIL_SIZE", "50"))
+
+AsyncMemory = Union[RollingSummaryMemory, SemanticRecallMemory]
 
-class InMemorySummarizer:
+
+def _run_sync(coro: Awaitable, loop: Optional[asyncio.AbstractEventLoop]):
     """
-    ConversationSummaryBufferMemory를 대체하는 간단한 요약 메커니즘.
-    Redis에 저장된 메시지가 max_token_limit를 초과하면 요약을 생성합니다.
+    코루틴을 인스턴스가 만들어진 이벤트 루프(애플리케이션 루프)에 넘기고 다른 스레드에서 결과를 기다립니다.
+    Redis / Mongo 클라이언트와 write-behind 버퍼는 프로세스 전역이라 처음 사용한 루프에 묶이므로,
+    새 루프(asyncio.run)나 별도 루프에서는 실행하지 않습니다.
     """
-    
-    def __init__(
-        self,
-        chat_history: BaseChatMessageHistory,
-        llm: Any,
-        max_token_limit: int = 500,
-    ):
-        self.chat_history = chat_history
-        self.llm = llm
-        self.max_token_limit = max_token_limit
-    
-    def _estimate_tokens(self, messages: List[BaseMessage]) -> int:
-        """메시지 토큰 수 추정 (대략 4 chars = 1 token)"""
-        total_chars = sum(len(msg.content) for msg in messages)
-        return total_chars // 4
-    
-    def _summarize_messages(self, messages: List[BaseMessage]) -> str:
-        """메시지 리스트를 요약"""
-        conversation = "\n".join(
-            f"{'사용자' if isinstance(m, HumanMessage) else 'AI'}: {m.content}"
-            for m in messages
-        )
-        
-        summary_prompt = f"""다음 대화를 간결하게 요약해주세요:
-
-{conversation}
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coro.close()
+        raise RuntimeError("이벤트 루프 안에서는 invoke 대신 ainvoke를 사용해야 합니다.")
 
-요약:"""
-        
-        response = self.llm.invoke([HumanMessage(content=summary_prompt)])
-        return response.content
-    
-    def load_memory_variables(self) -> Dict[str, Any]:
-        """메모리 로드 (요약 포함)"""
-        messages = self.chat_history.messages
-        
-        if not messages:
-            return {"chat_history": []}
-        
-        # 토큰 수 체크
-        estimated_tokens = self._estimate_tokens(messages)
-        
-        if estimated_tokens > self.max_token_limit:
-            # 요약 생성 (최근 메시지는 유지)
-            summary_text = self._summarize_messages(messages[:-4])  # 마지막 4개 제외하고 요약
-            recent_messages = messages[-4:]
-            
-            # 요약을 시스템 메시지로 변환
-            from langchain_core.messages import SystemMessage
-            summary_msg = SystemMessage(content=f"이전 대화 요약: {summary_text}")
-            
-            return {"chat_history": [summary_msg] + recent_messages}
-        
-        return {"chat_history": messages}
-    
-    def save_context(self, inputs: Dict[str, str], outputs: Dict[str, str]) -> None:
-        """대화 저장"""
-        input_key = list(inputs.keys())[0]
-        output_key = list(outputs.keys())[0]
-        
-        self.chat_history.add_user_message(inputs[input_key])
-        self.chat_history.add_ai_message(outputs[output_key])
+    if loop is None or loop.is_closed() or not loop.is_running():
+        coro.close()
+        raise RuntimeError(
+            "MemoryRunnableV2.invoke는 인스턴스를 만든 이벤트 루프가 실행 중일 때 다른 스레드에서만 호출할 수 있습니다."
+        )
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
 
 
 class MemoryRunnableV2(Runnable):
     """
     새 LangChain 생태계 호환 Memory Runnable.
-    기존 MemoryRunnable과 동일한 인터페이스를 유지합니다.
+    session_id는 생성 시점이 아니라 호출 시 config["configurable"]["session_id"]로 전달받아
+    하나의 인스턴스(체인)를 여러 세션에서 재사용할 수 있습니다.
     """
     
     def __init__(
         self,
-        session_id: str,
         runnable: Runnable,
         save: bool = False,
         max_token_limit: int = 500,
         ttl: int = 60 * 60 * 24,
+        session_id: Optional[str] = None,
     ):
         self.runnable = runnable
-        self.memory = None
         self.save = save
         self.session_id = session_id
+        self.max_token_limit = max_token_limit
         self.ttl = ttl
-        
-        if session_id:
-            # Redis 채팅 히스토리
-            chat_history = RedisChatMessageHistory(
+
+        # 비동기 자원(Redis / Mongo / write-behind 버퍼)이 묶일 이벤트 루프 (동기 invoke는 이 루프에서 실행)
+        try:
+            self._loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+
+        # 요약용 LLM (gpt-3.5-turbo) - 인스턴스가 재사용되므로 한 번만 생성
+        self.summary_llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
+
+    def _resolve_session_id(self, config: Optional[RunnableConfig]) -> Optional[str]:
+        """호출 시 전달된 config의 configurable.session_id를 우선 사용"""
+        configurable = (config or {}).get("configurable", {})
+        return configurable.get("session_id", self.session_id)
+
+    def _build_async_memory(self, session_id: Optional[str]) -> Optional[AsyncMemory]:
+        """
+        세션별 비동기 메모리 생성 (프로세스 전역 Redis 커넥션 풀 공유).
+        최근 메시지는 저장된 토큰 수 기준으로 max_token_limit 안에 들어가는 만큼만 원문으로 넣습니다.
+        MEMORY_MODE=summary(기본): Redis에 저장된 증분 요약을 읽기만 하고, 갱신은 저장 후 백그라운드에서 수행합니다.
+        MEMORY_MODE=semantic: 요약 대신 현재 입력과 관련된 과거 턴을 벡터 검색으로 회상합니다.
+        """
+        if not session_id:
+            return None
+
+        if MEMORY_MODE == "semantic":
+            return SemanticRecallMemory(
                 session_id=str(session_id),
-                url=os.getenv("REDIS_URL", "redis://localhost:6379"),
-                ttl=ttl,
+                embedder=get_embedder(),
+                index=semantic_recall_index,
+                max_token_limit=self.max_token_limit,
+                max_recent_messages=CHAT_HISTORY_TAIL_SIZE,
+                ttl=self.ttl,
+                tail_size=CHAT_HISTORY_TAIL_SIZE,
             )
-            
-            # 요약용 LLM (gpt-3.5-turbo)
-            summary_llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
-            
-            # 커스텀 요약 메모리
-            self.memory = InMemorySummarizer(
-                chat_history=chat_history,
-                llm=summary_llm,
-                max_token_limit=max_token_limit,
-            )
-    
+
+        return RollingSummaryMemory(
+            session_id=str(session_id),
+            llm=self.summary_llm,
+            max_token_limit=self.max_token_limit,
+            max_recent_messages=CHAT_HISTORY_TAIL_SIZE,
+            ttl=self.ttl,
+            tail_size=CHAT_HISTORY_TAIL_SIZE,
+        )
+
+    async def aload_chat_history(self, input_dict: Dict[str, Any], config=None) -> str:
+        """
+        프롬프트에 들어갈 chat_history를 미리 로드합니다.
+        결과를 입력의 "chat_history"로 넘기면 ainvoke / astream에서 다시 읽지 않습니다.
+        """
+        memory = self._build_async_memory(self._resolve_session_id(config))
+        return await self._aload_chat_history(memory, input_dict)
+
+    async def _aload_chat_history(self, memory: Optional[AsyncMemory], input_dict: Dict[str, Any]) -> str:
+        if "chat_history" in input_dict:
+            return input_dict["chat_history"]
+        if not memory:
+            return ""
+
+        raw_history = (await memory.aload_memory_variables(input_dict))["chat_history"]
+        if not raw_history:
+            return ""
+        return self._format_chat_history(raw_history) if isinstance(raw_history, list) else raw_history
+
     def _format_chat_history(self, messages: List[BaseMessage]) -> str:
         """메시지 리스트를 문자열로 포맷팅"""
         if not messages:
@@ -138,48 +147,48 @@ class MemoryRunnableV2(Runnable):
         
         return "\n".join(formatted)
     
-    def invoke(self, input_dict: Dict[str, Any], config=None) -> str:
-        """동기 실행"""
-        chat_history = ""
-        if self.memory:
-            raw_history = self.memory.load_memory_variables()["chat_history"]
-            if raw_history:
-                chat_history = (
-                    self._format_chat_history(raw_history)
-                    if isinstance(raw_history, list)
-                    else raw_history
-                )
-        
-        merged_input = {**input_dict, "chat_history": str(chat_history)}
-        output = self.runnable.invoke(merged_input, config)
-        
-        if self.memory and self.save:
-            self.memory.save_context(
-                {"input_text": merged_input.get("input_text", merged_input.get("input", ""))},
-                {"output_text": output}
-            )
-        
-        return output
+    def invoke(self, input_dict: Dict[str, Any], config=None, **kwargs) -> str:
+        """
+        동기 실행 (ainvoke와 같은 경로를 인스턴스가 만들어진 이벤트 루프에서 실행하고 결과를 기다림).
+        실행 중인 애플리케이션 루프가 있을 때 워커 스레드에서만 사용할 수 있습니다.
+        """
+        return _run_sync(self.ainvoke(input_dict, config), self._loop)
     
     async def ainvoke(self, input_dict: Dict[str, Any], config=None) -> str:
         """비동기 실행"""
-        chat_history = ""
-        if self.memory:
-            raw_history = self.memory.load_memory_variables()["chat_history"]
-            if raw_history:
-                chat_history = (
-                    self._format_chat_history(raw_history)
-                    if isinstance(raw_history, list)
-                    else raw_history
-                )
+        memory = self._build_async_memory(self._resolve_session_id(config))
+        chat_history = await self._aload_chat_history(memory, input_dict)
         
         merged_input = {**input_dict, "chat_history": str(chat_history)}
         output = await self.runnable.ainvoke(merged_input, config)
         
-        if self.memory and self.save:
-            self.memory.save_context(
+        if memory and self.save:
+            await memory.asave_context(
                 {"input_text": merged_input.get("input_text", merged_input.get("input", ""))},
                 {"output_text": output}
             )
         
         return output
+
+    async def astream(self, input_dict: Dict[str, Any], config=None, **kwargs) -> AsyncIterator[str]:
+        """비동기 스트리밍 실행 (청크를 그대로 전달하고, 스트림이 끝나면 전체 응답을 저장)"""
+        memory = self._build_async_memory(self._resolve_session_id(config))
+        chat_history = await self._aload_chat_history(memory, input_dict)
+
+        merged_input = {**input_dict, "chat_history": str(chat_history)}
+        chunks = []
+        async for chunk in self.runnable.astream(merged_input, config, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+
+        if memory and self.save:
+            await memory.asave_context(
+                {"input_text": merged_input.get("input_text", merged_input.get("input", ""))},
+                {"output_text": "".join(chunks)}
+            )
+
+
+async def clear_session_memory(session_id: str) -> None:
+    """세션의 Redis tail / 요약 / 회상 인덱스 캐시 제거 (원본 Mongo 기록이 바뀌었을 때 호출)"""
+    semantic_recall_index.invalidate(session_id)
+    await RollingSummaryMemory(session_id=session_id, llm=None).aclear()
@@ -0,0 +1,186 @@
+"""
+Mongo(chat_history)를 원본으로 하고, 세션별 최근 메시지(tail)만 Redis에 캐싱하는 채팅 히스토리.
+쓰기는 Mongo write-behind 버퍼에 넣은 뒤 Redis tail이 있을 때만 덧붙이고, 읽을 때 tail이 없으면(만료/축출) Mongo에서 다시 채웁니다.
+Redis는 프로세스 전역 커넥션 풀(core.db.redis_db.get_redis)을 공유하고, 항목은 message_codec의
+압축 인코딩(토큰 수 포함)으로 저장합니다. 키는 langchain_community RedisChatMessageHistory와 같고 기존 항목도 읽습니다.
+"""
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from redis.asyncio import Redis
+
+from ai.memory.message_codec import decode_message, encode_message
+from app.chat_history.document.chat_history import ChatHistory
+from app.chat_history.repository import chat_history_repo
+from app.chat_history.repository.chat_history_write_buffer import chat_history_write_buffer
+from core.db.redis_db import get_redis
+from core.util.token_util import count_tokens
+
+# tail과 전체 메시지 수가 함께 캐싱되어 있을 때만 메시지를 추가하고 길이를 제한
+# (수가 없는 tail은 절대 위치를 알 수 없으므로 지우고, 다음 읽기에서 Mongo로부터 재구성)
+# appends는 tail 유무와 관계없이 증가시켜서, 진행 중인 재구성이 이 추가를 놓쳤는지 알 수 있게 함
+_APPEND_SCRIPT = """
+local ttl = tonumber(ARGV[2])
+redis.call('HINCRBY', KEYS[2], 'appends', 1)
+if ttl > 0 then
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+if redis.call('HEXISTS', KEYS[2], 'count') == 0 then
+    redis.call('DEL', KEYS[1])
+    return 0
+end
+local size = tonumber(ARGV[1])
+for i = 3, #ARGV do
+    redis.call('LPUSH', KEYS[1], ARGV[i])
+end
+redis.call('LTRIM', KEYS[1], 0, size - 1)
+redis.call('HINCRBY', KEYS[2], 'count', #ARGV - 2)
+if ttl > 0 then
+    redis.call('EXPIRE', KEYS[1], ttl)
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+return 1
+"""
+
+# Mongo에서 읽은 tail과 전체 메시지 수를 다시 채움.
+# Mongo를 읽는 동안 다른 요청이 메시지를 추가했으면(appends 변경) 그 메시지가 빠졌을 수 있으므로 쓰지 않음
+# 상태 hash의 다른 필드(요약 워터마크 등)는 유지하되, 워터마크가 새 메시지 수보다 크면 함께 초기화
+_REBUILD_SCRIPT = """
+if (redis.call('HGET', KEYS[2], 'appends') or '0') ~= ARGV[3] then
+    return 0
+end
+local total = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+redis.call('DEL', KEYS[1])
+for i = 4, #ARGV do
+    redis.call('RPUSH', KEYS[1], ARGV[i])
+end
+if tonumber(redis.call('HGET', KEYS[2], 'covered') or '0') > total then
+    redis.call('HDEL', KEYS[2], 'summary', 'covered')
+end
+redis.call('HSET', KEYS[2], 'count', total)
+if ttl > 0 then
+    redis.call('EXPIRE', KEYS[1], ttl)
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+return 1
+"""
+
+
+def _to_messages(history: ChatHistory) -> List[BaseMessage]:
+    # 토큰 수는 여기서 한 번만 계산해서 캐시 항목에 함께 저장 (원본 기록 id도 함께 보관)
+    history_id = str(history.id)
+    return [
+        HumanMessage(content=history.input_text, additional_kwargs={"token_count": count_tokens(history.input_text), "history_id": history_id}),
+        AIMessage(content=history.output_text, additional_kwargs={"token_count": count_tokens(history.output_text), "history_id": history_id}),
+    ]
+
+
+class CachedChatMessageHistory:
+    def __init__(
+        self,
+        session_id: str,
+        key_prefix: str = "message_store:",
+        ttl: Optional[int] = None,
+        tail_size: int = 50,
+        redis: Optional[Redis] = None,
+    ):
+        """
+        Args:
+            session_id: 대화 세션 ID
+            key_prefix: Redis 리스트 키 prefix
+            ttl: Redis 키 만료 시간
+            tail_size: Redis에 유지할 최근 메시지 수 (사용자/AI 메시지 각각 1개)
+        """
+        self.session_id = session_id
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        self.tail_size = tail_size
+        self.redis = redis or get_redis()
+
+    @property
+    def key(self) -> str:
+        return self.key_prefix + self.session_id
+
+    @property
+    def state_key(self) -> str:
+        # 세션 상태 hash. count = 지금까지 추가된 전체 메시지 수 (tail이 잘려도 절대 위치를 계산하기 위해 보관)
+        # 절대 위치에 의존하는 값(요약 워터마크 등)은 같은 hash에 저장해서 count와 함께 만료 / 초기화되게 함
+        return "message_state:" + self.session_id
+
+    async def aadd_exchange(self, input_text: str, output_text: str) -> ChatHistory:
+        """한 턴을 Mongo write-behind 버퍼에 넣고, 캐싱된 tail이 있으면 함께 갱신"""
+        chat_history = await chat_history_write_buffer.put(session_id=self.session_id, input_text=input_text, output_text=output_text)
+
+        await self.redis.eval(
+            _APPEND_SCRIPT, 2, self.key, self.state_key,
+            self.tail_size, self.ttl or 0,
+            *[encode_message(m) for m in _to_messages(chat_history)],
+        )
+        return chat_history
+
+    async def aget_recent_messages(self, limit: int) -> Tuple[List[BaseMessage], int, Dict[bytes, bytes]]:
+        """
+        최근 limit개 메시지, 전체 메시지 수, 세션 상태 hash를 한 번의 왕복으로 조회합니다.
+        tail이 캐싱되어 있지 않거나 전체 메시지 수가 없으면 Mongo에서 재구성합니다.
+
+        Returns:
+            (오래된 순 메시지, 전체 메시지 수, 세션 상태 hash)
+        """
+        limit = min(limit, self.tail_size)
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.lrange(self.key, 0, limit - 1)
+            pipe.llen(self.key)
+            pipe.hgetall(self.state_key)
+            items, length, state = await pipe.execute()
+
+        if length == 0 or b"count" not in state:
+            messages, total = await self._rebuild(int(state.get(b"appends", 0)))
+            state = await self.redis.hgetall(self.state_key)
+            return messages[-limit:] if limit > 0 else [], total, state
+
+        total = int(state[b"count"])
+        messages = [decode_message(item) for item in items[::-1]]
+        return messages, total, state
+
+    async def _rebuild(self, appends: int) -> Tuple[List[BaseMessage], int]:
+        """
+        Mongo에서 최근 tail과 전체 메시지 수를 읽어 Redis에 다시 채움 (아직 버퍼에 있는 기록 포함).
+        appends는 재구성 전에 읽은 추가 횟수로, 그 사이 추가된 메시지가 있으면 Redis에 쓰지 않고 다음 읽기에서 다시 구성합니다.
+        """
+        pending = chat_history_write_buffer.pending(self.session_id)
+        stored, stored_count = await asyncio.gather(
+            chat_history_repo.find(self.session_id, size=self.tail_size // 2),
+            chat_history_repo.count_by_session_id(self.session_id),
+        )
+
+        # 조회 전 스냅샷은 조회 중에 flush된 기록을, 조회 후 스냅샷은 조회 중에 추가된 기록을 담음 (id로 중복 제거)
+        stored_ids = {history.id for history in stored}
+        pending = list({
+            history.id: history
+            for history in pending + chat_history_write_buffer.pending(self.session_id)
+            if history.id not in stored_ids
+        }.values())
+        histories = (stored[::-1] + pending)[-(self.tail_size // 2):]
+        if not histories:
+            return [], 0
+
+        total = (stored_count + len(pending)) * 2
+        messages = [m for history in histories for m in _to_messages(history)]
+
+        await self.redis.eval(
+            _REBUILD_SCRIPT, 2, self.key, self.state_key,
+            total, self.ttl or 0, appends,
+            *[encode_message(m) for m in messages[::-1]],
+        )
+
+        return messages, total
+
+    async def aclear(self) -> None:
+        """캐싱된 tail과 세션 상태 제거 (원본인 Mongo는 그대로)"""
+        await self.redis.delete(self.key, self.state_key)
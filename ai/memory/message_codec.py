@@ -0,0 +1,73 @@
+"""
+Redis 대화 tail 항목의 압축 인코딩.
+LangChain message_to_dict JSON 대신 [role, content, token_count(, history_id)] 배열을 orjson으로 직렬화하고,
+긴 항목은 zstd로 압축합니다. token_count는 저장 시 한 번만 계산해서 함께 보관하고,
+history_id(원본 chat_history 기록 id)가 있으면 함께 저장합니다.
+기존 LangChain JSON 항목도 그대로 읽을 수 있습니다.
+"""
+import json
+from typing import Optional
+
+import orjson
+import zstandard
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, messages_from_dict
+
+from core.util.token_util import count_tokens
+
+_ROLE_TO_MESSAGE = {"h": HumanMessage, "a": AIMessage, "s": SystemMessage}
+
+# zstd frame magic number (압축된 항목 판별용)
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+# 이보다 짧은 항목은 압축 이득보다 frame 오버헤드가 커서 압축하지 않음
+COMPRESS_MIN_BYTES = 256
+
+_compressor = zstandard.ZstdCompressor(level=3)
+_decompressor = zstandard.ZstdDecompressor()
+
+
+def token_count_of(message: BaseMessage) -> int:
+    """저장 시 계산해 둔 토큰 수 (없으면 새로 계산)"""
+    token_count = message.additional_kwargs.get("token_count")
+    if token_count is None:
+        token_count = count_tokens(message.content)
+    return token_count
+
+
+def _role_of(message: BaseMessage) -> str:
+    """메시지 역할 코드 (AIMessageChunk 같은 하위 클래스도 부모 역할로 저장)"""
+    for role, message_class in _ROLE_TO_MESSAGE.items():
+        if isinstance(message, message_class):
+            return role
+    raise ValueError(f"인코딩할 수 없는 메시지 타입입니다: {type(message).__name__}")
+
+
+def encode_message(message: BaseMessage, token_count: Optional[int] = None) -> bytes:
+    if token_count is None:
+        token_count = token_count_of(message)
+
+    fields = [_role_of(message), message.content, token_count]
+    history_id = message.additional_kwargs.get("history_id")
+    if history_id is not None:
+        fields.append(history_id)
+
+    data = orjson.dumps(fields)
+    if len(data) >= COMPRESS_MIN_BYTES:
+        return _compressor.compress(data)
+    return data
+
+
+def decode_message(data: bytes) -> BaseMessage:
+    if data.startswith(_ZSTD_MAGIC):
+        data = _decompressor.decompress(data)
+
+    # 압축 인코딩 도입 전 항목 (LangChain message_to_dict JSON)
+    if data.startswith(b"{"):
+        message = messages_from_dict([json.loads(data)])[0]
+        message.additional_kwargs.setdefault("token_count", count_tokens(message.content))
+        return message
+
+    role, content, token_count, *rest = orjson.loads(data)
+    additional_kwargs = {"token_count": token_count}
+    if rest:
+        additional_kwargs["history_id"] = rest[0]
+    return _ROLE_TO_MESSAGE[role](content=content, additional_kwargs=additional_kwargs)
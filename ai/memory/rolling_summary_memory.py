@@ -0,0 +1,146 @@
+"""
+Redis에 저장되는 증분(rolling) 요약 메모리.
+요약과 함께 "요약이 덮는 메시지 수(covered)"를 워터마크로 세션 상태 hash(전체 메시지 수와 같은 키)에 저장하고,
+요청 경로에서는 저장된 요약 + 토큰 예산(max_token_limit) 안에 들어가는 최근 메시지만 읽습니다.
+요약 갱신은 응답 이후 백그라운드 task에서, 예산 창 밖으로 밀려난 메시지만 기존 요약에 접어 넣습니다.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Set
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from ai.memory.cached_chat_message_history import CachedChatMessageHistory
+from ai.memory.token_window import select_token_window
+
+# covered가 저장된 값보다 클 때만 요약을 갱신 (다른 워커가 먼저 더 앞까지 요약했으면 무시)
+# 읽은 뒤 상태가 만료 / 재구성되어 count가 없거나 더 작으면 워터마크가 맞지 않으므로 버림
+_UPDATE_SUMMARY_SCRIPT = """
+local count = redis.call('HGET', KEYS[1], 'count')
+if not count or tonumber(ARGV[2]) > tonumber(count) then
+    return 0
+end
+local covered = tonumber(redis.call('HGET', KEYS[1], 'covered') or '0')
+if tonumber(ARGV[2]) <= covered then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'summary', ARGV[1], 'covered', ARGV[2])
+if tonumber(ARGV[3]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return 1
+"""
+
+# 진행 중인 요약 task 참조 (GC 방지) / 세션별 중복 실행 방지
+_summary_tasks: Set[asyncio.Task] = set()
+_summarizing_sessions: Set[str] = set()
+
+
+class RollingSummaryMemory:
+    def __init__(
+        self,
+        session_id: str,
+        llm: Any,
+        max_token_limit: int = 500,
+        max_recent_messages: int = 50,
+        ttl: Optional[int] = None,
+        tail_size: int = 50,
+    ):
+        """
+        Args:
+            session_id: 대화 세션 ID
+            llm: 요약용 LLM
+            max_token_limit: 원문으로 유지할 최근 메시지의 토큰 예산 (넘친 메시지는 요약에 접어 넣음)
+            max_recent_messages: 요청 경로에서 읽는 최대 메시지 수 (요약이 밀려 있어도 상한 유지)
+            ttl: 요약 키 만료 시간 (메시지 키와 동일하게 설정)
+            tail_size: Redis에 캐싱할 최근 메시지 수
+        """
+        self.session_id = session_id
+        self.llm = llm
+        self.max_token_limit = max_token_limit
+        self.max_recent_messages = max_recent_messages
+        self.ttl = ttl
+        self.chat_history = CachedChatMessageHistory(session_id=session_id, ttl=ttl, tail_size=tail_size)
+
+    async def _load(self):
+        """요약되지 않은 메시지, 전체 메시지 수, 요약, 워터마크를 한 번의 왕복으로 조회"""
+        messages, total, state = await self.chat_history.aget_recent_messages(self.max_recent_messages)
+        summary = state.get(b"summary", b"").decode("utf-8")
+        covered = min(int(state.get(b"covered", 0)), total)
+
+        # messages[i]의 절대 위치 = total - len(messages) + i
+        first_index = total - len(messages)
+        uncovered = messages[max(covered - first_index, 0):]
+        return uncovered, total, summary, covered
+
+    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """메모리 로드 (저장된 요약 + 토큰 예산 안의 최근 메시지, LLM 호출 없음)"""
+        uncovered, _, summary, _ = await self._load()
+
+        # 요약이 아직 따라오지 못한 메시지가 있어도 프롬프트 크기는 예산으로 고정
+        keep = select_token_window(uncovered, self.max_token_limit)
+        uncovered = uncovered[len(uncovered) - keep:]
+
+        if summary:
+            summary_msg = SystemMessage(content=f"이전 대화 요약: {summary}")
+            return {"chat_history": [summary_msg] + uncovered}
+
+        return {"chat_history": uncovered}
+
+    async def asave_context(self, inputs: Dict[str, str], outputs: Dict[str, str]) -> None:
+        """대화 저장 후 요약 갱신을 백그라운드로 예약"""
+        input_key = list(inputs.keys())[0]
+        output_key = list(outputs.keys())[0]
+
+        await self.chat_history.aadd_exchange(inputs[input_key], outputs[output_key])
+
+        if self.session_id in _summarizing_sessions:
+            return
+        _summarizing_sessions.add(self.session_id)
+        task = asyncio.create_task(self._update_summary())
+        _summary_tasks.add(task)
+        task.add_done_callback(_summary_tasks.discard)
+
+    async def aclear(self) -> None:
+        """캐싱된 tail과 요약 제거 (요약은 세션 상태 hash에 함께 저장됨, 다음 턴에 Mongo에서 다시 구성)"""
+        await self.chat_history.aclear()
+
+    async def _update_summary(self) -> None:
+        try:
+            uncovered, total, summary, covered = await self._load()
+
+            keep = select_token_window(uncovered, self.max_token_limit)
+            if keep >= len(uncovered):
+                return
+
+            # 토큰 예산 창 밖으로 밀려난 메시지만 기존 요약에 접어 넣음
+            folded = uncovered[:len(uncovered) - keep]
+            new_summary = await self._fold(summary, folded)
+            new_covered = total - keep
+
+            await self.chat_history.redis.eval(
+                _UPDATE_SUMMARY_SCRIPT, 1, self.chat_history.state_key, new_summary, new_covered, self.ttl or 0
+            )
+        except Exception as e:
+            print(f"[RollingSummaryMemory] failed to update summary for session {self.session_id}: {e}")
+        finally:
+            _summarizing_sessions.discard(self.session_id)
+
+    async def _fold(self, summary: str, messages: List[BaseMessage]) -> str:
+        """기존 요약에 새 메시지를 반영한 요약 생성"""
+        conversation = "\n".join(
+            f"{'사용자' if isinstance(m, HumanMessage) else 'AI'}: {m.content}"
+            for m in messages
+        )
+
+        summary_prompt = f"""기존 대화 요약에 이어지는 대화를 반영해서 간결한 요약을 새로 작성해주세요:
+
+[기존 요약]
+{summary or "(없음)"}
+
+[이어지는 대화]
+{conversation}
+
+요약:"""
+
+        response = await self.llm.ainvoke([HumanMessage(content=summary_prompt)])
+        return response.content
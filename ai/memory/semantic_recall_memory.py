@@ -0,0 +1,268 @@
+"""
+의미 기반 장기 대화 회상 메모리 (MEMORY_MODE=semantic).
+세션의 과거 대화(chat_history_repo)를 한 턴(사용자+AI) 단위로 임베딩해 세션별 인메모리 벡터 인덱스에 두고,
+매 턴 현재 입력과 가장 관련 있는 과거 턴 몇 개를 최근 대화 창과 함께 제공합니다.
+LLM 요약 호출 없이 쿼리 임베딩 1회 + 로컬 검색으로 회상하고, 인덱스 갱신은 새로 저장된 턴만 임베딩합니다.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage, SystemMessage
+
+from ai.memory.cached_chat_message_history import CachedChatMessageHistory
+from ai.memory.token_window import select_token_window
+from app.chat_history.repository import chat_history_repo
+from core.embedder.embedder import Embedder
+from core.vectorstores.numpy_vectorstore import NumpyVectorStore
+
+load_dotenv()
+
+# 이번 턴 임베딩 task 참조 (GC 방지)
+_append_tasks: Set[asyncio.Task] = set()
+
+
+def _format_exchange(input_text: str, output_text: str) -> str:
+    return f"사용자: {input_text}\n나: {output_text}"
+
+
+def _order(history_id: str) -> int:
+    """기록 id(ObjectId)의 정렬 키. 앞 4바이트가 생성 시각이라 인덱싱 순서와 관계없이 대화 순서를 따름"""
+    return int(history_id, 16)
+
+
+@dataclass
+class _SessionIndex:
+    store: NumpyVectorStore
+    refreshed_at: float
+    # Mongo에서 마지막으로 반영한 기록 id (증분 갱신 기준)
+    last_id: Optional[ObjectId] = None
+    # store에 들어 있는 기록 id -> 정렬 키
+    orders: Dict[str, int] = field(default_factory=dict)
+
+
+class SemanticRecallIndex:
+    """
+    세션별 대화 벡터 인덱스 관리자.
+    인덱스는 처음 필요할 때 chat_history_repo에서 최근 max_exchanges 턴을 읽어 만들고,
+    max_sessions개까지 LRU로 유지하고, 세션마다 최근 max_exchanges 턴만 남깁니다. ttl이 지나면 인덱스를 버리지 않고 마지막으로 반영한 id 이후의
+    기록(다른 워커에서 추가된 턴)만 조회해 임베딩하므로, 갱신 비용은 새 턴 수에 비례합니다.
+    """
+
+    # write-behind 버퍼 때문에 id가 더 작은 기록이 늦게 저장될 수 있어 갱신 시 조금 앞에서부터 조회 (중복은 제외)
+    refresh_overlap = timedelta(seconds=60)
+
+    def __init__(self, max_sessions: int = 1000, max_exchanges: int = 200, ttl_seconds: float = 600):
+        self.max_sessions = max_sessions
+        self.max_exchanges = max_exchanges
+        self.ttl_seconds = ttl_seconds
+
+        self._sessions: "OrderedDict[str, _SessionIndex]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get(self, session_id: str, embedder: Embedder) -> NumpyVectorStore:
+        entry = self._get_fresh(session_id)
+        if entry is not None:
+            return entry.store
+
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        try:
+            async with lock:
+                entry = self._sessions.get(session_id)
+                if entry is None:
+                    entry = _SessionIndex(store=NumpyVectorStore(namespace=session_id), refreshed_at=0.0)
+                if time.monotonic() - entry.refreshed_at > self.ttl_seconds:
+                    await self._refresh(session_id, entry, embedder)
+                    self._put(session_id, entry)
+                return entry.store
+        finally:
+            if not lock.locked():
+                self._locks.pop(session_id, None)
+
+    def _get_fresh(self, session_id: str) -> Optional[_SessionIndex]:
+        entry = self._sessions.get(session_id)
+        if entry is None or time.monotonic() - entry.refreshed_at > self.ttl_seconds:
+            return None
+
+        self._sessions.move_to_end(session_id)
+        return entry
+
+    def _put(self, session_id: str, entry: _SessionIndex) -> None:
+        self._sessions[session_id] = entry
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    async def _refresh(self, session_id: str, entry: _SessionIndex, embedder: Embedder) -> None:
+        """처음이면 최근 max_exchanges 턴, 이후에는 last_id 이후에 저장된 턴만 임베딩해 추가"""
+        if entry.last_id is None:
+            histories = (await chat_history_repo.find(session_id, size=self.max_exchanges))[:self.max_exchanges]
+        else:
+            after_id = ObjectId.from_datetime(entry.last_id.generation_time - self.refresh_overlap)
+            histories = await chat_history_repo.find_after_id(session_id, size=self.max_exchanges, after_id=after_id)
+
+        if histories:
+            entry.last_id = max(entry.last_id or histories[0].id, histories[0].id)
+
+        histories = [h for h in histories if str(h.id) not in entry.orders]
+        if len(entry.orders) >= self.max_exchanges:
+            # 이미 가득 찬 인덱스에서 곧바로 밀려날 오래된 턴은 임베딩하지 않음
+            oldest = min(entry.orders.values())
+            histories = [h for h in histories if _order(str(h.id)) > oldest]
+        if histories:
+            docs = [
+                Document(page_content=text, metadata={"text": text})
+                for text in (_format_exchange(h.input_text, h.output_text) for h in histories)
+            ]
+            vectors = await embedder.embed_documents(docs)
+            await self._add(entry, [str(h.id) for h in histories], vectors)
+
+        entry.refreshed_at = time.monotonic()
+
+    async def _add(self, entry: _SessionIndex, history_ids: List[str], vectors: List[Dict[str, Any]]) -> None:
+        """임베딩된 턴을 추가하고, max_exchanges를 넘으면 가장 오래된 턴부터 제거"""
+        # 임베딩을 기다리는 동안 같은 턴이 다른 경로로 추가됐을 수 있으므로 다시 확인
+        added = {}
+        for history_id, vector in zip(history_ids, vectors):
+            if history_id in entry.orders or history_id in added:
+                continue
+            vector["metadata"]["order"] = _order(history_id)
+            added[history_id] = {**vector, "id": history_id}
+
+        orders = {**entry.orders, **{history_id: _order(history_id) for history_id in added}}
+        evicted = sorted(orders, key=orders.get)[:max(len(orders) - self.max_exchanges, 0)]
+        removed = [history_id for history_id in evicted if history_id in entry.orders]
+        for history_id in evicted:
+            del orders[history_id]
+            added.pop(history_id, None)
+        entry.orders = orders
+
+        await entry.store.upsert_vectors(list(added.values()))
+        if removed:
+            await entry.store.delete_by_ids(removed)
+
+    def order_before_latest(self, session_id: str, exchanges: int) -> Optional[int]:
+        """인덱스의 최신 exchanges 턴을 제외하는 정렬 키 상한 (제외할 턴이 없으면 None)"""
+        entry = self._sessions.get(session_id)
+        if entry is None or exchanges <= 0:
+            return None
+        latest = sorted(entry.orders.values(), reverse=True)[:exchanges]
+        return latest[-1] if latest else None
+
+    async def append(self, session_id: str, embedder: Embedder, history_id: str, input_text: str, output_text: str) -> None:
+        """이미 로드된 인덱스에 이번 턴을 추가 (로드되지 않은 세션은 다음 갱신 때 Mongo에서 반영)"""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return
+
+        text = _format_exchange(input_text, output_text)
+        vectors = await embedder.embed_documents([Document(page_content=text, metadata={"text": text})])
+        await self._add(entry, [history_id], vectors)
+
+    def invalidate(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+
+class SemanticRecallMemory:
+    def __init__(
+        self,
+        session_id: str,
+        embedder: Embedder,
+        index: SemanticRecallIndex,
+        max_token_limit: int = 500,
+        max_recent_messages: int = 50,
+        recall_k: int = 3,
+        ttl: Optional[int] = None,
+        tail_size: int = 50,
+    ):
+        """
+        Args:
+            session_id: 대화 세션 ID
+            embedder: 쿼리/대화 임베딩에 사용할 Embedder
+            index: 세션별 벡터 인덱스 관리자
+            max_token_limit: 원문으로 유지할 최근 메시지의 토큰 예산
+            max_recent_messages: 최근 창을 고를 때 읽는 최대 메시지 수
+            recall_k: 최근 창 밖에서 회상할 과거 턴 수
+            ttl: Redis 메시지 키 만료 시간
+            tail_size: Redis에 캐싱할 최근 메시지 수
+        """
+        self.session_id = session_id
+        self.embedder = embedder
+        self.index = index
+        self.max_token_limit = max_token_limit
+        self.max_recent_messages = max_recent_messages
+        self.recall_k = recall_k
+        self.chat_history = CachedChatMessageHistory(session_id=session_id, ttl=ttl, tail_size=tail_size)
+
+    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """최근 창 + 현재 입력과 관련된 과거 턴 로드 (LLM 호출 없음)"""
+        query = inputs.get("input_text", inputs.get("input", ""))
+
+        (recent, _, _), store, query_vector = await asyncio.gather(
+            self.chat_history.aget_recent_messages(self.max_recent_messages),
+            self.index.get(self.session_id, self.embedder),
+            self.embedder.embed_query(query),
+        )
+
+        keep = select_token_window(recent, self.max_token_limit)
+        recent = recent[len(recent) - keep:]
+
+        # 최근 창에 이미 들어 있는 턴(창의 가장 오래된 기록 이후)은 회상 대상에서 제외
+        oldest_id = recent[0].additional_kwargs.get("history_id") if recent else None
+        if oldest_id is not None:
+            before = _order(oldest_id)
+        else:
+            # 기록 id 없이 캐싱된 이전 형식의 tail이면 인덱스의 최신 턴을 창 크기만큼 제외
+            before = self.index.order_before_latest(self.session_id, (keep + 1) // 2)
+
+        recalled: List[BaseMessage] = []
+        if (await store.stats())["total_vector_count"] > 0:
+            result = await store.query_by_vector(
+                vector=query_vector,
+                top_k=self.recall_k,
+                filter={"order": {"$lt": before}} if before is not None else None,
+            )
+            # 대화 흐름대로 오래된 턴부터 나열
+            matches = sorted(result.matches, key=lambda m: m.metadata["order"])
+            if matches:
+                recalled_text = "\n".join(m.metadata["text"] for m in matches)
+                recalled.append(SystemMessage(content=f"관련된 이전 대화:\n{recalled_text}"))
+
+        return {"chat_history": recalled + recent}
+
+    async def asave_context(self, inputs: Dict[str, str], outputs: Dict[str, str]) -> None:
+        input_key = list(inputs.keys())[0]
+        output_key = list(outputs.keys())[0]
+
+        chat_history = await self.chat_history.aadd_exchange(inputs[input_key], outputs[output_key])
+
+        # 이번 턴 임베딩은 응답 이후 백그라운드에서 인덱스에 추가
+        task = asyncio.create_task(
+            self._append(str(chat_history.id), inputs[input_key], outputs[output_key])
+        )
+        _append_tasks.add(task)
+        task.add_done_callback(_append_tasks.discard)
+
+    async def aclear(self) -> None:
+        """캐싱된 tail과 세션 인덱스 제거 (다음 턴에 Mongo에서 다시 구성)"""
+        self.index.invalidate(self.session_id)
+        await self.chat_history.aclear()
+
+    async def _append(self, history_id: str, input_text: str, output_text: str) -> None:
+        try:
+            await self.index.append(self.session_id, self.embedder, history_id, input_text, output_text)
+        except Exception as e:
+            print(f"[SemanticRecallMemory] failed to index exchange for session {self.session_id}: {e}")
+
+semantic_recall_index = SemanticRecallIndex(
+    max_sessions=int(os.getenv("SEMANTIC_MEMORY_MAX_SESSIONS", "1000")),
+    max_exchanges=int(os.getenv("SEMANTIC_MEMORY_MAX_EXCHANGES", "200")),
+    ttl_seconds=float(os.getenv("SEMANTIC_MEMORY_TTL", "600")),
+)
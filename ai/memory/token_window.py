@@ -0,0 +1,22 @@
+from typing import List
+
+from langchain_core.messages import BaseMessage
+
+from ai.memory.message_codec import token_count_of
+
+
+def select_token_window(messages: List[BaseMessage], max_tokens: int) -> int:
+    """
+    저장된 토큰 수로 max_tokens 안에 들어가는 최신 메시지 수를 계산합니다 (히스토리를 다시 토큰화하지 않음).
+    사용자/AI 한 턴(2개) 단위로 자르며, 가장 최근 턴은 예산을 넘어도 항상 포함합니다.
+    """
+    used = 0
+    keep = 0
+    for end in range(len(messages), 0, -2):
+        exchange = messages[max(end - 2, 0):end]
+        tokens = sum(token_count_of(m) for m in exchange)
+        if keep > 0 and used + tokens > max_tokens:
+            break
+        used += tokens
+        keep += len(exchange)
+    return keep
@@ -1,4 +1,9 @@
+import json
+from typing import Any, AsyncIterator, Dict
+
 from fastapi import APIRouter, Depends, Query
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
 
 from core.grpcs.client import UserGrpcClient
 from core.grpcs.client.chatbot_grpc_client import ChatbotGrpcClient
@@ -26,6 +31,28 @@ async def chat(
     chatbot_response = await chatbot_service.chat(chatbot_id, chat_request, user_id, user_grpc_client, event_publisher)
     return BaseResponse(message="chatbot successfully answered", data=chatbot_response)
 
+# 캐릭터 챗 (SSE 스트리밍)
+@router.post("/chat/{chatbot_id}/stream")
+async def chat_stream(
+        chatbot_id: int,
+        chat_request : ChatRequest,
+        user_id : str = Depends(get_user_id),
+        user_grpc_client : UserGrpcClient = Depends(user_stub_dep),
+        event_publisher: EventPublisher = Depends(get_event_publisher),
+    ) -> StreamingResponse:
+    events, release_reservation = await chatbot_service.chat_stream(chatbot_id, chat_request, user_id, user_grpc_client, event_publisher)
+    return StreamingResponse(
+        _to_sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # 스트림이 시작되기 전에 연결이 끊겨도 예약 해제
+        background=BackgroundTask(release_reservation),
+    )
+
+async def _to_sse(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for event in events:
+        yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
 # 캐릭터 챗봇 생성
 @router.post("/generate/{character_id}")
 async def generate(
@@ -1,12 +1,17 @@
 from app.chat_history.document.chat_history import ChatHistory
-from typing import List
-from beanie.operators import Eq, LT
+from typing import List, Optional
+from beanie.operators import Eq, GT, LT
 from beanie import SortDirection, operators as oper, PydanticObjectId
 from bson import ObjectId
 
-async def save(session_id : str, input_text : str, output_text : str):
+async def save(session_id : str, input_text : str, output_text : str) -> ChatHistory:
     chat_history = ChatHistory(session_id=session_id, input_text=input_text, output_text=output_text)
     await chat_history.save()
+    return chat_history
+
+
+async def insert_many(chat_histories : List[ChatHistory]):
+    await ChatHistory.insert_many(chat_histories, ordered=False)
 
 
 async def find(session_id: str, size: int) -> List[ChatHistory]:
@@ -31,6 +36,26 @@ async def find_by_cursor_id(session_id: str, size: int, cursor_id: str) -> List[
     return chat_history
 
 
+async def find_after_id(session_id: str, size: int, after_id: ObjectId) -> List[ChatHistory]:
+    chat_history = (
+        await ChatHistory.find(
+            GT(ChatHistory.id, after_id), Eq(ChatHistory.session_id, session_id)
+        )
+        .sort(("_id", SortDirection.DESCENDING))
+        .limit(size)
+        .to_list()
+    )
+    return chat_history
+
+
+async def count_by_session_id(session_id : str) -> int:
+    return await ChatHistory.find(Eq(ChatHistory.session_id, session_id)).count()
+
+
+async def find_by_id(history_id : str) -> Optional[ChatHistory]:
+    return await ChatHistory.get(PydanticObjectId(history_id))
+
+
 async def delete_by_session_id(session_id : str):
     await ChatHistory.find(ChatHistory.session_id == session_id).delete()
 
@@ -0,0 +1,176 @@
+"""
+chat_history write-behind 버퍼.
+요청 경로에서는 ChatHistory를 큐에 넣기만 하고, 백그라운드 worker가 max_wait_ms마다 또는 batch_size개가 모이면
+insert_many로 한 번에 저장합니다. 큐가 가득 차면 put이 대기해서 요청 쪽에 backpressure가 걸립니다.
+저장이 실패하면 기록을 버리지 않고 저장될 때까지 backoff(최대 max_backoff_ms)로 재시도하며, 그동안 큐가 차면서 backpressure가 걸립니다.
+아직 저장되지 않은 기록은 pending()으로 조회할 수 있어 Redis tail 재구성 시 함께 반영됩니다.
+"""
+import asyncio
+import os
+from typing import Dict, List, Optional
+
+from beanie import PydanticObjectId
+from dotenv import load_dotenv
+from pymongo.errors import BulkWriteError
+
+from app.chat_history.document.chat_history import ChatHistory
+from app.chat_history.repository import chat_history_repo
+
+load_dotenv()
+
+# insert_many 재시도 시 이미 저장된 문서의 중복 키 에러는 성공으로 간주
+_DUPLICATE_KEY_ERROR = 11000
+
+
+class ChatHistoryWriteBuffer:
+    def __init__(
+        self,
+        max_queue_size: int = 10000,
+        batch_size: int = 200,
+        max_wait_ms: float = 20,
+        max_backoff_ms: float = 5000,
+    ):
+        """
+        Args:
+            max_queue_size: 저장 대기 중인 최대 기록 수 (가득 차면 put이 대기)
+            batch_size: 한 번에 insert_many로 보낼 최대 기록 수
+            max_wait_ms: 첫 기록 이후 배치를 모으는 최대 대기 시간
+            max_backoff_ms: insert_many 실패 시 재시도 간격의 상한
+        """
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_backoff = max_backoff_ms / 1000
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending: Dict[str, List[ChatHistory]] = {}
+        # 세션별 drain 대기자 (해당 세션 기록이 저장될 때마다 깨움)
+        self._flush_events: Dict[str, asyncio.Event] = {}
+
+        self.flushed = 0
+        self.failed_attempts = 0
+
+    def start(self) -> None:
+        if self._worker is not None and not self._worker.done():
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.create_task(self._run())
+
+    async def put(self, session_id: str, input_text: str, output_text: str) -> ChatHistory:
+        """기록을 큐에 넣고 바로 반환 (id는 클라이언트에서 미리 생성)"""
+        self.start()
+
+        chat_history = ChatHistory(id=PydanticObjectId(), session_id=session_id, input_text=input_text, output_text=output_text)
+        self._pending.setdefault(session_id, []).append(chat_history)
+        try:
+            await self._queue.put(chat_history)
+        except BaseException:
+            # 큐가 가득 차 대기하던 중 취소되면 기록은 큐에 들어가지 않으므로 pending에서도 제거 (drain이 영원히 기다리지 않도록)
+            self._discard_pending(chat_history)
+            raise
+        return chat_history
+
+    def pending(self, session_id: str) -> List[ChatHistory]:
+        """아직 Mongo에 저장되지 않은 세션 기록 (오래된 순)"""
+        return list(self._pending.get(session_id, []))
+
+    def find_pending(self, history_id: str) -> Optional[ChatHistory]:
+        """아직 저장되지 않은 기록을 id로 조회"""
+        for pending in self._pending.values():
+            for chat_history in pending:
+                if str(chat_history.id) == history_id:
+                    return chat_history
+        return None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[ChatHistory]) -> None:
+        """저장될 때까지 재시도 (실패한 배치를 버리지 않음, 그동안 쌓이는 기록은 큐 maxsize로 backpressure)"""
+        attempt = 0
+        try:
+            while True:
+                try:
+                    await chat_history_repo.insert_many(batch)
+                    break
+                except BulkWriteError as e:
+                    errors = e.details.get("writeErrors", [])
+                    if errors and all(error.get("code") == _DUPLICATE_KEY_ERROR for error in errors):
+                        break
+                    print(f"[ChatHistoryWriteBuffer] insert_many failed (attempt {attempt + 1}, {len(batch)} pending): {e}")
+                except Exception as e:
+                    print(f"[ChatHistoryWriteBuffer] insert_many failed (attempt {attempt + 1}, {len(batch)} pending): {e}")
+
+                self.failed_attempts += 1
+                await asyncio.sleep(min(0.1 * 2 ** min(attempt, 16), self.max_backoff))
+                attempt += 1
+
+            self.flushed += len(batch)
+            for chat_history in batch:
+                self._discard_pending(chat_history)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _discard_pending(self, chat_history: ChatHistory) -> None:
+        session_id = chat_history.session_id
+        pending = self._pending.get(session_id)
+        if pending:
+            pending[:] = [p for p in pending if p.id != chat_history.id]
+            if not pending:
+                del self._pending[session_id]
+
+        event = self._flush_events.pop(session_id, None)
+        if event is not None:
+            event.set()
+
+    async def drain(self, session_id: str) -> None:
+        """
+        지금까지 넣은 해당 세션의 기록이 모두 저장될 때까지 대기 (삭제 전에 호출해서 늦게 저장되는 기록을 막음).
+        다른 세션의 기록이나 호출 이후에 들어온 기록은 기다리지 않습니다.
+        """
+        waiting = {chat_history.id for chat_history in self._pending.get(session_id, [])}
+        while waiting:
+            event = self._flush_events.setdefault(session_id, asyncio.Event())
+            await event.wait()
+            waiting &= {chat_history.id for chat_history in self._pending.get(session_id, [])}
+
+    async def close(self, timeout: float = 30) -> None:
+        """남은 기록을 저장하고 worker 종료 (애플리케이션 종료 시 호출, Mongo 장애로 timeout 안에 저장하지 못하면 경고만 남김)"""
+        if self._queue is not None and self._worker is not None and not self._worker.done():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                unsaved = sum(len(pending) for pending in self._pending.values())
+                print(f"[ChatHistoryWriteBuffer] shutting down with {unsaved} unsaved chat histories")
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self._queue = None
+
+
+chat_history_write_buffer = ChatHistoryWriteBuffer(
+    max_queue_size=int(os.getenv("CHAT_HISTORY_BUFFER_SIZE", "10000")),
+    batch_size=int(os.getenv("CHAT_HISTORY_BATCH_SIZE", "200")),
+    max_wait_ms=float(os.getenv("CHAT_HISTORY_BATCH_MAX_WAIT_MS", "20")),
+)
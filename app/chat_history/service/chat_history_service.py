@@ -1,5 +1,7 @@
 from api.schemas.common.response.cursor_response import CursorResponse
 from app.chat_history.repository import chat_history_repo
+from app.chat_history.repository.chat_history_write_buffer import chat_history_write_buffer
+from ai.memory.MemoryRunnableV2 import clear_session_memory
 from core.sessions import session_id_generator
 
 
@@ -24,8 +26,17 @@ async def get_chat_histories(chatbot_id : int, cursor_id : str, size : int, user
 
 async def delete_by_session_id(chatbot_id : int, user_id : str):
     session_id = await session_id_generator.generate_chat_session_id(chatbot_id=chatbot_id, user_id=user_id)
+    # 버퍼에 남은 이 세션의 기록이 삭제 이후에 저장되지 않도록 먼저 flush
+    await chat_history_write_buffer.drain(session_id)
     await chat_history_repo.delete_by_session_id(session_id=session_id)
+    await clear_session_memory(session_id)
 
 
 async def delete_by_history_id(history_id : str):
-    await chat_history_repo.delete_history_by_history_id(history_id=history_id)
\ No newline at end of file
+    # 아직 버퍼에 있는 기록이면 저장된 뒤에 삭제
+    chat_history = chat_history_write_buffer.find_pending(history_id) or await chat_history_repo.find_by_id(history_id=history_id)
+    if chat_history is not None:
+        await chat_history_write_buffer.drain(chat_history.session_id)
+    await chat_history_repo.delete_history_by_history_id(history_id=history_id)
+    if chat_history is not None:
+        await clear_session_memory(chat_history.session_id)
\ No newline at end of file
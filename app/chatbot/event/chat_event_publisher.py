@@ -16,7 +16,8 @@ async def publish_chat_event(
     success: bool = True,
     error_message: Optional[str] = None,
     response_time_ms: Optional[int] = None,
-    model_name: str = "gpt-5"
+    model_name: str = "gpt-5",
+    time_to_first_token_ms: Optional[int] = None,
 ) -> bool:
 
     # 토큰 사용량 검증
@@ -34,10 +35,12 @@ async def publish_chat_event(
         "content_token_count": token_usage.get("prompt_tokens", 0),
         "answer_token_count": token_usage.get("completion_tokens", 0) if success else None,
         "total_token_count": token_usage.get("total_tokens", 0),
+        "cached_token_count": token_usage.get("cached_prompt_tokens"),
         "success": success,
         "error_message": error_message,
         "response_time_ms": response_time_ms,
-        "model_name": model_name
+        "model_name": model_name,
+        "time_to_first_token_ms": time_to_first_token_ms
     }
     
     # Kafka 토픽에 발행
@@ -1,43 +1,69 @@
 from typing import List
 
 from langchain_core.documents import Document
-from langchain_core.vectorstores import VectorStoreRetriever
 
-from core.vectorstores.pinecone_vectorstore import PineconeVectorStore
+from core.vectorstores.mmr import maximal_marginal_relevance
+from core.vectorstores.vector_store import VectorStore
+from core.vectorstores.vector_store_factory import get_vector_store
 from core.embedder.embedder import Embedder
 from app.chatbot.exception.upsert_pinecone_failed_exception import UpsertPineconeFailedException
 
 
-class CharacterVectorStore(PineconeVectorStore):
-    def __init__(self, character_name : str = None, character_id : int = None):
+class CharacterVectorStore:
+    def __init__(self, character_name : str = None, character_id : int = None, vector_store : VectorStore = None):
         self.character_name = character_name
         self.character_id = character_id
-        super().__init__(namespace=str(self.character_id))
+        self.namespace = str(self.character_id)
+        # 백엔드(Pinecone / NumPy)는 VECTOR_STORE_BACKEND 설정에 따라 선택
+        self.vector_store = vector_store or get_vector_store(self.namespace)
 
-    # override
     async def upsert(self, docs : List[Document], embed_model : Embedder):
         try:
-            await super().upsert_documents(docs=docs, embed_model=embed_model)
+            await self.vector_store.upsert_documents(docs=docs, embed_model=embed_model)
             return True
         except Exception as e:
             print(str(e))
             raise UpsertPineconeFailedException(self.character_name)
 
-    async def delete(self, embed_model : Embedder):
-        self._init_vectorstore(embedder=embed_model)
-        self.vectorstore.delete(delete_all=True, namespace=self.namespace)
-
-    # 말투 넣을거임
-    def retriever(self, embed_model: Embedder, top_k : int = 5, search_type : str = "mmr") -> VectorStoreRetriever:
-        self._init_vectorstore(embedder=embed_model)
-        retriever = self.vectorstore.as_retriever(
-            # search_type
-            # similarity
-            # mmr
-            search_type=search_type,
-            search_kwargs={
-                "k": top_k,
-                "filter": {"source": {"$eq": self.character_id}}
-            },
+    async def delete(self):
+        await self.vector_store.delete_all()
+
+    async def hybrid_search(self, query_vector : List[float], top_k : int = 5, fetch_k : int = 20, lambda_mult : float = 0.5) -> List[Document]:
+        """
+        similarity top-k + mmr 하이브리드 검색.
+        vector store에서 fetch_k개를 값(values)과 함께 한 번만 조회하고, mmr은 로컬에서 계산한 뒤 중복을 제거해 합칩니다.
+        """
+        results = await self.vector_store.query_by_vector(
+            vector=query_vector,
+            top_k=max(top_k, fetch_k),
+            filter={"source": {"$eq": self.character_id}},
+            include_values=True,
+        )
+        matches = results.matches
+        if not matches:
+            return []
+
+        docs = []
+        for match in matches:
+            metadata = dict(match.metadata or {})
+            docs.append(Document(page_content=metadata.pop("text", ""), metadata=metadata))
+        sim_docs = docs[:top_k]
+        mmr_indices = maximal_marginal_relevance(
+            query_vector,
+            [match.values for match in matches],
+            k=top_k,
+            lambda_mult=lambda_mult,
         )
-        return retriever
+        mmr_docs = [docs[i] for i in mmr_indices]
+
+        seen, merged = set(), []
+        for d in sim_docs + mmr_docs:
+            if d.page_content not in seen:
+                merged.append(d)
+                seen.add(d.page_content)
+        return merged
+
+
+def get_character_vector_store(character_id : int, character_name : str = None) -> CharacterVectorStore:
+    """캐릭터(namespace)별로 캐싱된 vector store를 사용하는 CharacterVectorStore 반환"""
+    return CharacterVectorStore(character_name=character_name, character_id=character_id)
@@ -1,5 +1,4 @@
 from dotenv import load_dotenv
-from langchain_core.vectorstores import VectorStoreRetriever
 from app.chatbot.service.document_converter import document_converter
 from app.chatbot.service.namuwiki_crawler_service import namuwiki_crawler_service
 from app.chatbot.service.vector_store_service import vector_store_service
@@ -9,57 +8,60 @@ from api.schemas.common.response.cursor_response import CursorResponse
 from api.schemas.request.chatbot_request import ChatRequest, ChatBotGenerateRequest
 from api.schemas.response.chatbot_response import ChatResponse, ChatBotResponse
 from app.chatbot.document.chatbot import ChatBot, CharacterWordSet
-from app.chatbot.repository.character_vector_store import CharacterVectorStore
-from core.embedder.embedder import Embedder
-from typing import List, Tuple
+from app.chatbot.repository.character_vector_store import CharacterVectorStore, get_character_vector_store
+from core.embedder.embedder import Embedder, get_embedder
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional, Tuple
 from ai.character_chat_bot import CharacterChatBot
+from ai.character_chat_bot_registry import character_chat_bot_registry
 from app.chatbot_wordset.repository import chatbot_wordset_repo
 from app.chatbot.repository import chatbot_repo
 from app.chatbot.exception.already_exists_chatbot_exception import AlreadyExistsChatbotException
 from app.chatbot.exception.insufficient_token_exception import InsufficientTokenException
 from core.fallbacks.rollback_pinecone_on_mongo_failure import rollback_pinecone_on_mongo_failure
 from core.sessions import session_id_generator
+from core.tokens.token_ledger import token_ledger
 from app.chatbot.mapper import chatbot_mapper
 from app.chatbot.event.chat_event_publisher import publish_chat_event
 from core.events.event_publisher import EventPublisher
+import asyncio
 import time
 
 load_dotenv()
 
 
 async def chat(chatbot_id : int, chat_request : ChatRequest, user_id : str, user_grpc_client : UserGrpcClient, event_publisher: EventPublisher) -> ChatResponse:
-    remain_token = await user_grpc_client.get_user_remain_token(user_id=user_id)
-
     content = chat_request.content
-
-    chatbot = await _get_chatbot(chatbot_id)
-    chatbot_name = chatbot.name
-
-    mmr_retriever, similarity_retriever = await __get_retriever(chatbot_id, chatbot_name)
     session_id = await session_id_generator.generate_chat_session_id(chatbot_id=chatbot_id, user_id=user_id)
 
-    chatbot_instance = CharacterChatBot(character_name=chatbot_name, character_wordset=chatbot.character_wordset, session_id=session_id)
-
-    await chatbot_instance.build_chain(mmr_retriever=mmr_retriever, similarity_retriever=similarity_retriever)
+    # 토큰 잔량 / 챗봇 조회 / RAG 검색 / 대화 기록 로드를 동시에 수행
+    remain_token, chatbot_instance, context, chat_history = await _prepare_chat(
+        chatbot_id, session_id, content, user_id=user_id, user_grpc_client=user_grpc_client
+    )
 
-    # 실행 전 토큰 사용량 예측
-    estimated_tokens = await chatbot_instance.estimate_prompt_tokens(content)
+    # 실행 전 토큰 사용량 예측 (검색 결과와 대화 기록은 체인 실행과 공유해서 예측 = 실제 프롬프트)
+    estimated_tokens = await chatbot_instance.estimate_prompt_tokens(content, session_id, context=context, chat_history=chat_history)
     print(f"Estimated tokens: {estimated_tokens}, Remain tokens: {remain_token}")
 
-    # 토큰 부족 체크
-    if estimated_tokens > remain_token:
-        raise InsufficientTokenException(
-            required_tokens=estimated_tokens,
-            remain_tokens=remain_token
-        )
+    # 예상 토큰을 원자적으로 예약 (부족하면 InsufficientTokenException)
+    await _reserve_tokens(user_id, user_grpc_client, estimated_tokens)
 
     # 채팅 실행 및 토큰 사용량 측정 (시간 측정)
     start_time = time.time()
-    result = await chatbot_instance.ainvoke(content)
-    response_time_ms = int((time.time() - start_time) * 1000)
-    
-    answer = result["answer"]
-    token_usage = result.get("token_usage", {})
+    settled = False
+    try:
+        result = await chatbot_instance.ainvoke(content, session_id, context=context, chat_history=chat_history)
+        response_time_ms = int((time.time() - start_time) * 1000)
+
+        answer = result["answer"]
+        token_usage = result.get("token_usage", {})
+
+        # 예약을 실제 사용량으로 정산
+        await token_ledger.reconcile(user_id, estimated_tokens, token_usage.get("total_tokens", 0))
+        settled = True
+    finally:
+        # 실패 / 취소(클라이언트 연결 종료 등)로 정산되지 못한 예약은 해제
+        if not settled:
+            await token_ledger.release(user_id, estimated_tokens)
     
     print(f"Answer: {answer}")
     print(f"Token Usage: {token_usage}")
@@ -85,28 +87,111 @@ async def chat(chatbot_id : int, chat_request : ChatRequest, user_id : str, user
     return ChatResponse(answer=answer)
 
 
-async def dit_chat(chatbot_id: int, chat_request: ChatRequest, user_id: str) -> ChatResponse:
+async def chat_stream(chatbot_id : int, chat_request : ChatRequest, user_id : str, user_grpc_client : UserGrpcClient, event_publisher: EventPublisher) -> Tuple[AsyncIterator[Dict[str, Any]], Callable[[], Awaitable[None]]]:
+    """
+    스트리밍 채팅. 토큰 잔량 체크까지는 응답 시작 전에 끝내서 예외가 일반 에러 응답으로 나가도록 하고,
+    이후 청크 이벤트를 내보내는 async generator와 정산되지 않은 예약을 해제하는 함수를 반환합니다.
+    해제 함수는 응답의 BackgroundTask로 등록해야 합니다 (generator가 한 번도 실행되지 않고 연결이 끊겨도 예약이 풀리도록).
+    히스토리 저장 / 토큰 집계 / Kafka 발행은 스트림이 끝난 뒤 수행합니다.
+    """
+    # 첫 토큰까지의 시간은 사용자가 실제로 기다리는 시간(준비 / 검색 / 예약 포함)으로 측정
+    request_time = time.time()
     content = chat_request.content
-    chatbot = await _get_chatbot(chatbot_id)
-    chatbot_name = chatbot.name
-
-    mmr_retriever, similarity_retriever = await __get_retriever(chatbot_id, chatbot_name)
     session_id = await session_id_generator.generate_chat_session_id(chatbot_id=chatbot_id, user_id=user_id)
 
-    chatbot_instance = CharacterChatBot(
-        character_name=chatbot_name,
-        character_wordset=chatbot.character_wordset,
-        session_id=session_id
+    remain_token, chatbot_instance, context, chat_history = await _prepare_chat(
+        chatbot_id, session_id, content, user_id=user_id, user_grpc_client=user_grpc_client
     )
 
-    await chatbot_instance.build_chain(mmr_retriever=mmr_retriever, similarity_retriever=similarity_retriever)
+    estimated_tokens = await chatbot_instance.estimate_prompt_tokens(content, session_id, context=context, chat_history=chat_history)
+    print(f"Estimated tokens: {estimated_tokens}, Remain tokens: {remain_token}")
 
-    estimated_tokens = await chatbot_instance.estimate_prompt_tokens(content)
+    await _reserve_tokens(user_id, user_grpc_client, estimated_tokens)
+    settled = False
+
+    async def release_unsettled() -> None:
+        """정산되지 않은 예약 해제 (generator finally와 응답 BackgroundTask 양쪽에서 호출, 한 번만 해제)"""
+        nonlocal settled
+        if settled:
+            return
+        settled = True
+        await token_ledger.release(user_id, estimated_tokens)
+
+    async def stream(request_time: float) -> AsyncIterator[Dict[str, Any]]:
+        nonlocal settled
+        start_time = time.time()
+        time_to_first_token_ms = None
+
+        try:
+            async for event in chatbot_instance.astream(content, session_id, context=context, chat_history=chat_history):
+                if event["type"] == "token":
+                    if time_to_first_token_ms is None:
+                        time_to_first_token_ms = int((time.time() - request_time) * 1000)
+                        print(f"Time to first token: {time_to_first_token_ms}ms")
+                    yield event
+                    continue
+
+                response_time_ms = int((time.time() - start_time) * 1000)
+                answer = event["answer"]
+                token_usage = event["token_usage"]
+
+                await token_ledger.reconcile(user_id, estimated_tokens, token_usage.get("total_tokens", 0))
+                settled = True
+
+                print(f"Answer: {answer}")
+                print(f"Token Usage: {token_usage}")
+                print(f"Response time: {response_time_ms}ms")
+
+                await publish_chat_event(
+                    publisher=event_publisher,
+                    chatbot_id=chatbot_id,
+                    user_id=user_id,
+                    session_id=session_id,
+                    content=content,
+                    answer=answer,
+                    token_usage=token_usage,
+                    success=True,
+                    response_time_ms=response_time_ms,
+                    model_name=chatbot_instance.model_name,
+                    time_to_first_token_ms=time_to_first_token_ms,
+                )
+                yield {"type": "done", "time_to_first_token_ms": time_to_first_token_ms, "response_time_ms": response_time_ms}
+        except Exception as e:
+            # 스트림이 시작된 뒤에는 상태 코드를 바꿀 수 없으므로 에러 이벤트로 전달
+            print(f"error: {e}")
+            await publish_chat_event(
+                publisher=event_publisher,
+                chatbot_id=chatbot_id,
+                user_id=user_id,
+                session_id=session_id,
+                content=content,
+                answer=None,
+                token_usage={},
+                success=False,
+                error_message=str(e),
+                response_time_ms=int((time.time() - start_time) * 1000),
+                model_name=chatbot_instance.model_name,
+                time_to_first_token_ms=time_to_first_token_ms,
+            )
+            yield {"type": "error", "message": str(e)}
+        finally:
+            # 에러 / 클라이언트 연결 종료로 정산되지 못한 예약은 해제
+            await release_unsettled()
+
+    return stream(request_time), release_unsettled
+
+
+async def dit_chat(chatbot_id: int, chat_request: ChatRequest, user_id: str) -> ChatResponse:
+    content = chat_request.content
+    session_id = await session_id_generator.generate_chat_session_id(chatbot_id=chatbot_id, user_id=user_id)
+
+    _, chatbot_instance, context, chat_history = await _prepare_chat(chatbot_id, session_id, content)
+    estimated_tokens = await chatbot_instance.estimate_prompt_tokens(content, session_id, context=context, chat_history=chat_history)
     print(f"Estimated tokens: {estimated_tokens}")
 
     # 채팅 실행 및 토큰 사용량 측정 (시간 측정)
     start_time = time.time()
-    result = await chatbot_instance.ainvoke(content)
+    result = await chatbot_instance.ainvoke(content, session_id, context=context, chat_history=chat_history)
     response_time_ms = int((time.time() - start_time) * 1000)
 
     answer = result["answer"]
@@ -121,6 +206,75 @@ async def dit_chat(chatbot_id: int, chat_request: ChatRequest, user_id: str) ->
 
     return ChatResponse(answer=answer)
 
+
+async def _prepare_chat(
+    chatbot_id: int,
+    session_id: str,
+    content: str,
+    user_id: Optional[str] = None,
+    user_grpc_client: Optional[UserGrpcClient] = None,
+) -> Tuple[Optional[int], CharacterChatBot, str, str]:
+    """
+    채팅 실행 전에 필요한 I/O를 의존 관계에 따라 동시에 수행합니다.
+
+        토큰 잔량(장부/gRPC) ────────────────────┐
+        챗봇 조회(Mongo) → 체인 ─┬→ RAG 검색 ────┼→ 결과
+                                 └→ 대화 기록 ───┘
+
+    한 단계가 실패하면(챗봇 없음, 토큰 부족 등) 나머지 작업을 취소하고 그 예외를 그대로 전달합니다.
+    토큰 잔량은 검색 결과 없이 계산한 최소 예상치로 먼저 확인해서, 부족하면 검색 / 기록 로드를 기다리지 않습니다.
+
+    Returns:
+        (토큰 잔량 (user_grpc_client가 없으면 None), 챗봇 체인, RAG context, 대화 기록)
+    """
+    async def load_chatbot_instance() -> CharacterChatBot:
+        chatbot = await _get_chatbot(chatbot_id)
+        return await _get_chatbot_instance(chatbot)
+
+    async def retrieve_context() -> str:
+        return await (await instance_task).retrieve_context(content)
+
+    async def load_chat_history() -> str:
+        return await (await instance_task).load_chat_history(content, session_id)
+
+    async def check_remain_token() -> int:
+        # 캐싱된 잔량이 있으면 gRPC 조회 없이 사용
+        remain_token = await token_ledger.available(user_id, _remain_token_loader(user_grpc_client, user_id))
+        minimum_tokens = await (await instance_task).estimate_prompt_tokens(content, session_id, context="", chat_history="")
+        if minimum_tokens > remain_token:
+            raise InsufficientTokenException(required_tokens=minimum_tokens, remain_tokens=remain_token)
+        return remain_token
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            instance_task = tg.create_task(load_chatbot_instance())
+            token_task = tg.create_task(check_remain_token()) if user_grpc_client is not None else None
+            context_task = tg.create_task(retrieve_context())
+            history_task = tg.create_task(load_chat_history())
+    except BaseExceptionGroup as e:
+        # 가장 먼저 실패한 단계의 예외를 그대로 올려서 기존 예외 핸들러(404, 토큰 부족 등)가 처리하도록 함
+        raise e.exceptions[0]
+
+    remain_token = token_task.result() if token_task is not None else None
+    return remain_token, instance_task.result(), context_task.result(), history_task.result()
+
+
+def _remain_token_loader(user_grpc_client: UserGrpcClient, user_id: str):
+    return lambda: user_grpc_client.get_user_remain_token(user_id=user_id)
+
+
+async def _reserve_tokens(user_id: str, user_grpc_client: UserGrpcClient, estimated_tokens: int) -> None:
+    """예상 토큰을 장부에 예약 (같은 유저의 동시 요청이 잔량을 초과해서 쓰지 않도록 원자적으로 처리)"""
+    reserved, remain_token = await token_ledger.reserve(
+        user_id, estimated_tokens, _remain_token_loader(user_grpc_client, user_id)
+    )
+    if not reserved:
+        raise InsufficientTokenException(
+            required_tokens=estimated_tokens,
+            remain_tokens=remain_token
+        )
+
+
 async def find_chatbot(chatbot_id : int) -> ChatBot:
     chatbot = await _get_chatbot(chatbot_id)
     return chatbot
@@ -130,15 +284,26 @@ async def _get_chatbot(chatbot_id: int) -> ChatBot:
     return chatbot
 
 
-async def __get_retriever(character_id : int, character_name : str) -> Tuple[VectorStoreRetriever, VectorStoreRetriever]:
-    character_pinecone_dao = CharacterVectorStore(
+async def _get_chatbot_instance(chatbot: ChatBot) -> CharacterChatBot:
+    # 챗봇 버전별로 빌드된 체인을 재사용 (캐시 미스일 때만 retriever 생성 + build_chain)
+    async def build() -> CharacterChatBot:
+        character_vector_store, embedder = await __get_vector_store(chatbot.id, chatbot.name)
+        chatbot_instance = CharacterChatBot(character_name=chatbot.name, character_wordset=chatbot.character_wordset, chatbot_id=chatbot.id)
+        await chatbot_instance.build_chain(vector_store=character_vector_store, embedder=embedder)
+        return chatbot_instance
+
+    version = character_chat_bot_registry.build_version(chatbot.name, chatbot.character_wordset)
+    return await character_chat_bot_registry.get_or_build(chatbot.id, version, build)
+
+
+async def __get_vector_store(character_id : int, character_name : str) -> Tuple[CharacterVectorStore, Embedder]:
+    # Pinecone 클라이언트 / 임베딩 클라이언트는 프로세스 전역에서 공유
+    character_vector_store = get_character_vector_store(
         character_id=character_id,
         character_name=character_name
     )
-    embedder = Embedder()
-    mmr_retriever = character_pinecone_dao.retriever(embed_model=embedder, top_k=5, search_type="mmr")
-    similarity_retriever = character_pinecone_dao.retriever(embed_model=embedder, top_k=5, search_type="similarity")
-    return mmr_retriever, similarity_retriever
+    embedder = get_embedder()
+    return character_vector_store, embedder
 
 async def generate(character_id : int, chatbot_generate_request : ChatBotGenerateRequest, chatbot_grpc_client : ChatbotGrpcClient):
     print("check exsists ...")
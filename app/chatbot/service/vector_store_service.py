@@ -1,7 +1,7 @@
 from typing import List
 from langchain_core.documents import Document
-from app.chatbot.repository.character_vector_store import CharacterVectorStore
-from core.embedder.embedder import Embedder
+from app.chatbot.repository.character_vector_store import get_character_vector_store
+from core.embedder.embedder import get_embedder
 
 class VectorStoreService:
     async def upsert_character_documents(
@@ -10,8 +10,8 @@ class VectorStoreService:
         character_name: str, 
         documents: List[Document]
     ) -> None:
-        embedder = Embedder()
-        character_vector_store = CharacterVectorStore(
+        embedder = get_embedder()
+        character_vector_store = get_character_vector_store(
             character_name=character_name,
             character_id=character_id
         )
@@ -0,0 +1,34 @@
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from redis.asyncio import BlockingConnectionPool, Redis
+
+load_dotenv()
+
+# 프로세스 전역 Redis 클라이언트 (커넥션 풀 공유)
+_redis_client: Optional[Redis] = None
+
+
+def get_redis() -> Redis:
+    """
+    요청 하나가 토큰 장부 / 챗봇 캐시 / RAG 캐시 / 대화 기록을 동시에 조회하고 백그라운드 작업도 Redis를 쓰므로
+    커넥션 수는 (동시 요청 수 x 요청당 동시 호출 수) 기준으로 잡습니다.
+    풀이 가득 차면 에러 대신 REDIS_POOL_TIMEOUT초 동안 반납을 기다립니다 (BlockingConnectionPool).
+    """
+    global _redis_client
+    if _redis_client is None:
+        pool = BlockingConnectionPool.from_url(
+            os.getenv("REDIS_URL", "redis://localhost:6379"),
+            max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "256")),
+            timeout=float(os.getenv("REDIS_POOL_TIMEOUT", "5")),
+        )
+        _redis_client = Redis.from_pool(pool)
+    return _redis_client
+
+
+async def close_redis():
+    global _redis_client
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
@@ -1,6 +1,6 @@
 import asyncio
 import uuid
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from dotenv import load_dotenv
 import os
@@ -10,11 +10,27 @@ from langchain_openai import OpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from pinecone.db_data.types import VectorTypedDict
 
+from core.embedder.embedding_batcher import EmbeddingBatcher
+from core.embedder.embedding_cache import EmbeddingCache
+
 load_dotenv()
 
 class Embedder:
-    def __init__(self, model : str = "text-embedding-3-large"):
+    def __init__(
+        self,
+        model : str = "text-embedding-3-large",
+        cache : Optional[EmbeddingCache] = None,
+        batch_max_size : int = 0,
+        batch_max_wait_ms : float = 5,
+    ):
+        self.model = model
+        self.cache = cache
         self.emb = OpenAIEmbeddings(model=model, api_key=os.getenv("OPENAI_API_KEY"))
+        # batch_max_size > 0 이면 동시 쿼리 임베딩을 모아서 한 번에 요청
+        self.batcher = (
+            EmbeddingBatcher(self.emb.aembed_documents, max_batch_size=batch_max_size, max_wait_ms=batch_max_wait_ms)
+            if batch_max_size > 0 else None
+        )
 
     async def load(self, character_name : str, docs : List[Document], chunk_size : int = 800, chunk_overlap : int = 120) -> List[Document]:
         splitter = RecursiveCharacterTextSplitter(
@@ -41,6 +57,41 @@ class Embedder:
             })
         return vectors
 
-    async def embed_query(self, text : str):
-        return self.emb.embed_query(text)
+    async def embed_query(self, text : str) -> List[float]:
+        # 반복되는 인사말/질문은 임베딩 API 호출 없이 캐시에서 반환
+        if self.cache is not None:
+            cached = await self.cache.get(self.model, text)
+            if cached is not None:
+                return cached
+
+        if self.batcher is not None:
+            vector = await self.batcher.embed(text)
+        else:
+            vector = await self.emb.aembed_query(text)
+
+        if self.cache is not None:
+            await self.cache.set(self.model, text, vector)
+        return vector
+
+
+embedding_cache = EmbeddingCache(
+    max_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+    ttl=int(os.getenv("EMBEDDING_CACHE_TTL", str(60 * 60))),
+    use_redis=os.getenv("EMBEDDING_CACHE_REDIS", "false").lower() == "true",
+    redis_ttl=int(os.getenv("EMBEDDING_CACHE_REDIS_TTL", str(60 * 60 * 24))),
+)
+
+_embedders: Dict[str, Embedder] = {}
+
 
+def get_embedder(model : str = "text-embedding-3-large") -> Embedder:
+    """모델별 Embedder(OpenAIEmbeddings HTTP 클라이언트)를 프로세스 전역에서 공유"""
+    embedder = _embedders.get(model)
+    if embedder is None:
+        embedder = _embedders.setdefault(model, Embedder(
+            model=model,
+            cache=embedding_cache,
+            batch_max_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")),
+            batch_max_wait_ms=float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5")),
+        ))
+    return embedder
@@ -0,0 +1,75 @@
+"""
+동시에 들어오는 쿼리 임베딩 요청을 짧은 시간(max_wait_ms) 동안 모아서
+한 번의 aembed_documents 호출로 보내고, 결과를 각 요청에 돌려주는 micro-batcher.
+"""
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+
+class EmbeddingBatcher:
+    def __init__(
+        self,
+        embed_documents: Callable[[List[str]], Awaitable[List[List[float]]]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5,
+    ):
+        """
+        Args:
+            embed_documents: 텍스트 리스트를 한 번에 임베딩하는 함수 (예: OpenAIEmbeddings.aembed_documents)
+            max_batch_size: 한 번에 보낼 최대 텍스트 수 (도달하면 즉시 전송)
+            max_wait_ms: 첫 요청 이후 배치를 모으는 최대 대기 시간 (p50 지연과의 trade-off)
+        """
+        self.embed_documents = embed_documents
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.texts = 0
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        # 같은 배치 안의 동일한 텍스트는 한 번만 임베딩
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+        self.texts += len(unique_texts)
+
+        try:
+            vectors = await self.embed_documents(unique_texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        vector_by_text = dict(zip(unique_texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(vector_by_text[text])
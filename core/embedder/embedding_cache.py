@@ -0,0 +1,95 @@
+"""
+쿼리 임베딩 캐시.
+프로세스 내부 LRU(+TTL) 1차 캐시와 선택적인 Redis 공유 2차 캐시로 구성됩니다.
+로컬 캐시는 벡터를 float32 array로 보관합니다 (float list는 3072차원 기준 항목당 약 100KB, array는 약 12KB).
+"""
+import hashlib
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from core.db.redis_db import get_redis
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl: int = 60 * 60,
+        use_redis: bool = False,
+        redis_ttl: int = 60 * 60 * 24,
+        key_prefix: str = "embedding",
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self.redis_ttl = redis_ttl
+        self.key_prefix = key_prefix
+        self._entries: "OrderedDict[str, Tuple[float, array]]" = OrderedDict()
+
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """공백/유니코드 정규화 (같은 인사말이 같은 키가 되도록)"""
+        return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+    def _key(self, model: str, text: str) -> str:
+        digest = hashlib.sha256(self.normalize(text).encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}:{model}:{digest}"
+
+    async def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = self._key(model, text)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, vector = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.local_hits += 1
+                return vector.tolist()
+            del self._entries[key]
+
+        if self.use_redis:
+            try:
+                raw = await get_redis().get(key)
+            except Exception as e:
+                print(f"[EmbeddingCache] redis get failed: {e}")
+                raw = None
+            if raw:
+                vector = array("f", raw)
+                self._put_local(key, vector)
+                self.redis_hits += 1
+                return vector.tolist()
+
+        self.misses += 1
+        return None
+
+    async def set(self, model: str, text: str, vector: List[float]) -> None:
+        key = self._key(model, text)
+        packed = array("f", vector)
+        self._put_local(key, packed)
+
+        if self.use_redis:
+            try:
+                await get_redis().set(key, packed.tobytes(), ex=self.redis_ttl)
+            except Exception as e:
+                print(f"[EmbeddingCache] redis set failed: {e}")
+
+    def _put_local(self, key: str, vector: array) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+        }
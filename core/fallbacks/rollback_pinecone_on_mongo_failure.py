@@ -1,7 +1,6 @@
 from contextlib import asynccontextmanager
 
-from core.embedder.embedder import Embedder
-from app.chatbot.repository.character_vector_store import CharacterVectorStore
+from app.chatbot.repository.character_vector_store import get_character_vector_store
 
 @asynccontextmanager
 async def rollback_pinecone_on_mongo_failure(character_id : int, character_name : str):
@@ -9,6 +8,5 @@ async def rollback_pinecone_on_mongo_failure(character_id : int, character_name
         yield
     except Exception as e:
         print(e)
-        character_vector_store = CharacterVectorStore(character_name=character_name, character_id=character_id)
-        embedder = Embedder()
-        await character_vector_store.delete(embedder)
\ No newline at end of file
+        character_vector_store = get_character_vector_store(character_name=character_name, character_id=character_id)
+        await character_vector_store.delete()
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+프로세스 전역 gRPC 채널 풀.
+채널은 애플리케이션 lifespan에서 한 번 만들고 요청마다 새로 열지 않습니다.
+대상 주소는 dns:/// 로 해석해서 해석된 모든 주소에 round_robin으로 분산하고,
+keepalive로 유휴 연결이 끊기지 않게 유지합니다.
+
+keepalive 설정은 서버 정책과 맞아야 합니다. 서버의 permit_keepalive_time(grpc-java 기본 5분)보다
+자주 ping을 보내거나, 서버가 허용하지 않는데 호출 없이 ping을 보내면 서버가 GOAWAY(too_many_pings)로
+연결을 끊습니다. 그래서 기본값은 5분 간격, 호출이 있을 때만 ping이며, 서버 정책을 완화한 경우에만
+GRPC_KEEPALIVE_TIME_MS / GRPC_KEEPALIVE_PERMIT_WITHOUT_CALLS로 줄이거나 켜야 합니다.
+"""
+import itertools
+import json
+import os
+from typing import Dict, List, Optional
+
+import grpc
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_SERVICE_CONFIG = json.dumps({"loadBalancingConfig": [{"round_robin": {}}]})
+
+
+def _channel_options() -> list:
+    return [
+        ("grpc.service_config", _SERVICE_CONFIG),
+        ("grpc.keepalive_time_ms", int(os.getenv("GRPC_KEEPALIVE_TIME_MS", "300000"))),
+        ("grpc.keepalive_timeout_ms", int(os.getenv("GRPC_KEEPALIVE_TIMEOUT_MS", "20000"))),
+        ("grpc.keepalive_permit_without_calls", int(os.getenv("GRPC_KEEPALIVE_PERMIT_WITHOUT_CALLS", "0"))),
+        ("grpc.http2.max_pings_without_data", 0),
+        # 풀의 채널마다 별도 연결(subchannel)을 갖도록 함 (기본값은 같은 주소의 연결을 전역 공유)
+        ("grpc.use_local_subchannel_pool", 1),
+    ]
+
+
+class GrpcChannelPool:
+    def __init__(self, target: str, size: int = 2):
+        """
+        Args:
+            target: gRPC 서버 주소 (scheme이 없으면 dns:///를 붙여 모든 해석 주소를 사용)
+            size: 유지할 채널 수 (채널마다 HTTP/2 연결을 따로 가짐)
+        """
+        self.target = target if "://" in target else f"dns:///{target}"
+        self._channels: List[grpc.aio.Channel] = [
+            grpc.aio.insecure_channel(self.target, options=_channel_options())
+            for _ in range(max(size, 1))
+        ]
+        self._next = itertools.cycle(range(len(self._channels)))
+
+    def channel(self) -> grpc.aio.Channel:
+        """풀에서 채널을 돌아가며 반환"""
+        return self._channels[next(self._next)]
+
+    async def close(self) -> None:
+        for channel in self._channels:
+            await channel.close()
+        self._channels = []
+
+
+_channel_pools: Dict[str, GrpcChannelPool] = {}
+
+_TARGETS = {
+    "user": ("USER_GRPC_TARGET", "localhost:9090"),
+    "chatbot": ("GRPC_TARGET", "localhost:9090"),
+}
+
+
+def get_channel_pool(name: str) -> GrpcChannelPool:
+    pool: Optional[GrpcChannelPool] = _channel_pools.get(name)
+    if pool is None:
+        env_key, default = _TARGETS[name]
+        pool = GrpcChannelPool(
+            target=os.getenv(env_key, default),
+            size=int(os.getenv("GRPC_CHANNEL_POOL_SIZE", "2")),
+        )
+        _channel_pools[name] = pool
+    return pool
+
+
+def init_grpc_channels() -> None:
+    """애플리케이션 시작 시 채널 풀 생성 (연결은 첫 호출 시 맺고 이후 keepalive로 유지)"""
+    for name in _TARGETS:
+        get_channel_pool(name)
+
+
+async def close_grpc_channels() -> None:
+    for pool in _channel_pools.values():
+        await pool.close()
+    _channel_pools.clear()
@@ -1,3 +1,5 @@
+import time
+
 from core.grpcs.gen import user_pb2_grpc, user_pb2
 
 
@@ -16,5 +18,7 @@ class UserGrpcClient:
             int: 유저의 남은 토큰 수 (remain_token)
         """
         request = user_pb2.GetUserRemainTokenRequest(user_id=user_id)
+        start_time = time.time()
         response = await self._stub.getUserRemainToken(request)
+        print(f"[UserGrpcClient] getUserRemainToken: {int((time.time() - start_time) * 1000)}ms")
         return response.remain_token
@@ -1,14 +1,10 @@
-import os, grpc
-
+from core.grpcs.channels import get_channel_pool
 from core.grpcs.client.chatbot_grpc_client import ChatbotGrpcClient
 from core.grpcs.gen import get_character_pb2_grpc
 
 
-async def chatbot_stub_dep():
-    target = os.getenv("GRPC_TARGET", "localhost:9090")
-    channel = grpc.aio.insecure_channel(target)
-    try:
-        stub = get_character_pb2_grpc.GetCharacterServiceStub(channel)
-        yield ChatbotGrpcClient(stub)
-    finally:
-        await channel.close()
+async def chatbot_stub_dep() -> ChatbotGrpcClient:
+    # lifespan에서 만든 공유 채널을 사용 (요청마다 채널을 열고 닫지 않음)
+    channel = get_channel_pool("chatbot").channel()
+    stub = get_character_pb2_grpc.GetCharacterServiceStub(channel)
+    return ChatbotGrpcClient(stub)
@@ -1,18 +1,10 @@
-import os
-import grpc
-from dotenv import load_dotenv
-
+from core.grpcs.channels import get_channel_pool
 from core.grpcs.client.user_grpc_client import UserGrpcClient
 from core.grpcs.gen import user_pb2_grpc
 
-load_dotenv()
-
 
-async def user_stub_dep():
-    target = os.getenv("USER_GRPC_TARGET", "localhost:9090")
-    channel = grpc.aio.insecure_channel(target)
-    try:
-        stub = user_pb2_grpc.UserServiceStub(channel)
-        yield UserGrpcClient(stub)
-    finally:
-        await channel.close()
+async def user_stub_dep() -> UserGrpcClient:
+    # lifespan에서 만든 공유 채널을 사용 (요청마다 채널을 열고 닫지 않음)
+    channel = get_channel_pool("user").channel()
+    stub = user_pb2_grpc.UserServiceStub(channel)
+    return UserGrpcClient(stub)
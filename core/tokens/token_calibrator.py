@@ -0,0 +1,171 @@
+"""
+실제 토큰 사용량으로 스스로 보정되는 토큰 예측기.
+provider / model / 챗봇별로 (실제 입력 토큰 / tiktoken 계산값) 비율과 출력 토큰 수의
+지수 가중 평균 / 분산을 Redis에 저장하고(모든 pod 공유), 예측 시 평균 + z * 표준편차(상위 분위수)를 사용합니다.
+챗봇별 표본이 부족하면 같은 provider / model 전체 통계, 그것도 부족하면 기본값을 사용합니다.
+"""
+import asyncio
+import math
+import os
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from redis.asyncio import Redis
+
+from core.db.redis_db import get_redis
+
+load_dotenv()
+
+# 키마다 비율 / 출력 토큰의 지수 가중 평균과 분산을 갱신 (초기에는 1/n 가중치로 단순 평균처럼 동작)
+_UPDATE_SCRIPT = """
+local alpha = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+for i = 1, #KEYS do
+    local n = tonumber(redis.call('HGET', KEYS[i], 'n') or '0')
+    local weight = math.max(alpha, 1 / (n + 1))
+    for j, field in ipairs({'ratio', 'completion'}) do
+        local x = tonumber(ARGV[j])
+        local mean = tonumber(redis.call('HGET', KEYS[i], field .. '_mean') or tostring(x))
+        local var = tonumber(redis.call('HGET', KEYS[i], field .. '_var') or '0')
+        local diff = x - mean
+        local incr = weight * diff
+        mean = mean + incr
+        var = (1 - weight) * (var + diff * incr)
+        redis.call('HSET', KEYS[i], field .. '_mean', tostring(mean), field .. '_var', tostring(var))
+    end
+    redis.call('HINCRBY', KEYS[i], 'n', 1)
+    if ttl > 0 then
+        redis.call('EXPIRE', KEYS[i], ttl)
+    end
+end
+return 1
+"""
+
+Stats = Dict[str, float]
+
+_record_tasks: Set[asyncio.Task] = set()
+
+
+class TokenCalibrator:
+    def __init__(
+        self,
+        alpha: float = 0.05,
+        z: float = 1.645,
+        min_samples: int = 20,
+        cache_ttl_seconds: float = 60,
+        stats_ttl_seconds: int = 60 * 60 * 24 * 30,
+        default_prompt_ratio: float = 0.65,
+        default_completion_tokens: int = 1000,
+    ):
+        """
+        Args:
+            alpha: 지수 가중 평균의 가중치 (클수록 최근 사용량을 빠르게 반영)
+            z: 예측에 더할 표준편차 배수 (1.645 ≒ 정규분포 95% 분위수)
+            min_samples: 통계를 사용하기 위한 최소 표본 수
+            cache_ttl_seconds: 프로세스 로컬 통계 캐시 유지 시간
+            stats_ttl_seconds: Redis 통계 키 만료 시간 (더 이상 쓰지 않는 모델 정리)
+            default_prompt_ratio: 표본이 부족할 때 사용할 입력 토큰 보정 비율
+            default_completion_tokens: 표본이 부족할 때 사용할 출력 토큰 수
+        """
+        self.alpha = alpha
+        self.z = z
+        self.min_samples = min_samples
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.stats_ttl_seconds = stats_ttl_seconds
+        self.default_prompt_ratio = default_prompt_ratio
+        self.default_completion_tokens = default_completion_tokens
+
+        self._cache: Dict[str, Tuple[float, Optional[Stats]]] = {}
+
+    @property
+    def redis(self) -> Redis:
+        return get_redis()
+
+    @staticmethod
+    def _keys(provider: str, model_name: str, chatbot_id: Optional[int]) -> Tuple[str, ...]:
+        model_key = f"token_calibration:{provider}:{model_name}"
+        if chatbot_id is None:
+            return (model_key,)
+        return f"{model_key}:{chatbot_id}", model_key
+
+    async def _load(self, keys: Tuple[str, ...]) -> Tuple[Optional[Stats], ...]:
+        """키별 통계 조회 (로컬 캐시에 없거나 만료된 키만 Redis에서 읽음)"""
+        now = time.monotonic()
+        missing = [key for key in keys if key not in self._cache or self._cache[key][0] <= now]
+        if missing:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in missing:
+                    pipe.hgetall(key)
+                results = await pipe.execute()
+            for key, raw in zip(missing, results):
+                stats = {k.decode(): float(v) for k, v in raw.items()} if raw else None
+                self._cache[key] = (now + self.cache_ttl_seconds, stats)
+        return tuple(self._cache[key][1] for key in keys)
+
+    @staticmethod
+    def _upper(stats: Stats, field: str, z: float) -> float:
+        return stats[f"{field}_mean"] + z * math.sqrt(max(stats[f"{field}_var"], 0.0))
+
+    async def estimate(
+        self,
+        provider: str,
+        model_name: str,
+        chatbot_id: Optional[int],
+        raw_prompt_tokens: int,
+        conservative: bool = True,
+    ) -> Tuple[int, int]:
+        """
+        tiktoken으로 계산한 프롬프트 토큰 수를 실제 provider 기준으로 보정합니다.
+        conservative이면 사전 잔량 체크용으로 상위 분위수를, 아니면 평균을 사용합니다.
+
+        Returns:
+            (예상 입력 토큰 수, 예상 출력 토큰 수)
+        """
+        try:
+            candidates = await self._load(self._keys(provider, model_name, chatbot_id))
+        except Exception as e:
+            print(f"[TokenCalibrator] failed to load stats: {e}")
+            candidates = ()
+
+        stats = next((s for s in candidates if s and s.get("n", 0) >= self.min_samples), None)
+        if stats is None:
+            return int(raw_prompt_tokens * self.default_prompt_ratio), self.default_completion_tokens
+
+        z = self.z if conservative else 0.0
+        prompt_tokens = math.ceil(raw_prompt_tokens * self._upper(stats, "ratio", z))
+        completion_tokens = math.ceil(max(self._upper(stats, "completion", z), 1.0))
+        return prompt_tokens, completion_tokens
+
+    def record(
+        self,
+        provider: str,
+        model_name: str,
+        chatbot_id: Optional[int],
+        raw_prompt_tokens: int,
+        prompt_tokens: int,
+        completion_tokens: int,
+    ) -> None:
+        """provider가 보고한 실제 사용량을 백그라운드에서 통계에 반영"""
+        if raw_prompt_tokens <= 0 or prompt_tokens <= 0:
+            return
+        task = asyncio.create_task(self._record(
+            self._keys(provider, model_name, chatbot_id), prompt_tokens / raw_prompt_tokens, completion_tokens
+        ))
+        _record_tasks.add(task)
+        task.add_done_callback(_record_tasks.discard)
+
+    async def _record(self, keys: Tuple[str, ...], ratio: float, completion_tokens: int) -> None:
+        try:
+            await self.redis.eval(
+                _UPDATE_SCRIPT, len(keys), *keys, ratio, completion_tokens, self.alpha, self.stats_ttl_seconds
+            )
+        except Exception as e:
+            print(f"[TokenCalibrator] failed to record usage: {e}")
+
+
+token_calibrator = TokenCalibrator(
+    alpha=float(os.getenv("TOKEN_CALIBRATION_ALPHA", "0.05")),
+    z=float(os.getenv("TOKEN_CALIBRATION_Z", "1.645")),
+    min_samples=int(os.getenv("TOKEN_CALIBRATION_MIN_SAMPLES", "20")),
+)
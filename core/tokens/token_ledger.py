@@ -0,0 +1,121 @@
+"""
+유저별 남은 토큰 장부 (Redis, 모든 pod가 공유).
+user 서비스에서 조회한 잔량을 짧은 TTL로 캐싱하고, LLM 호출 전에 예상 토큰을 원자적으로 예약한 뒤
+호출이 끝나면 실제 사용량으로 정산합니다. 같은 유저의 동시 요청이 잔량을 초과해서 쓰지 않고,
+대부분의 메시지는 gRPC 조회 없이 처리됩니다.
+
+키:
+    token_ledger:balance:{user_id}   캐싱된 잔량 (정산된 실제 사용량만큼 차감, TTL 만료 시 gRPC로 다시 조회)
+    token_ledger:reserved:{user_id}  진행 중인 요청이 예약한 토큰 합계 (잔량 키가 만료돼도 유지)
+"""
+import os
+from typing import Awaitable, Callable, Tuple
+
+from dotenv import load_dotenv
+from redis.asyncio import Redis
+
+from core.db.redis_db import get_redis
+
+load_dotenv()
+
+BalanceLoader = Callable[[], Awaitable[int]]
+
+# 캐싱된 잔량이 없으면 nil, 있으면 (잔량 - 예약량)
+_AVAILABLE_SCRIPT = """
+local balance = redis.call('GET', KEYS[1])
+if not balance then
+    return nil
+end
+return tonumber(balance) - tonumber(redis.call('GET', KEYS[2]) or '0')
+"""
+
+# 잔량이 충분할 때만 예약 ({1, 예약 후 가용량} / 부족: {0, 가용량} / 캐시 없음: {-1, 0})
+_RESERVE_SCRIPT = """
+local balance = redis.call('GET', KEYS[1])
+if not balance then
+    return {-1, 0}
+end
+local available = tonumber(balance) - tonumber(redis.call('GET', KEYS[2]) or '0')
+local amount = tonumber(ARGV[1])
+if amount > available then
+    return {0, available}
+end
+redis.call('INCRBY', KEYS[2], amount)
+redis.call('EXPIRE', KEYS[2], tonumber(ARGV[2]))
+return {1, available - amount}
+"""
+
+# 예약을 풀고 실제 사용량만큼 캐싱된 잔량에서 차감 (잔량 키의 TTL은 유지)
+_RECONCILE_SCRIPT = """
+local reserved = redis.call('DECRBY', KEYS[2], tonumber(ARGV[1]))
+if reserved <= 0 then
+    redis.call('DEL', KEYS[2])
+end
+if tonumber(ARGV[2]) > 0 and redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('DECRBY', KEYS[1], tonumber(ARGV[2]))
+end
+return 1
+"""
+
+
+class TokenLedger:
+    def __init__(self, ttl_seconds: int = 30, reservation_ttl_seconds: int = 600):
+        """
+        Args:
+            ttl_seconds: 캐싱된 잔량의 유지 시간 (지나면 user 서비스에서 다시 조회)
+            reservation_ttl_seconds: 예약 합계 키의 유지 시간 (정산되지 못한 예약이 영구히 남지 않도록)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.reservation_ttl_seconds = reservation_ttl_seconds
+
+    @property
+    def redis(self) -> Redis:
+        return get_redis()
+
+    @staticmethod
+    def _keys(user_id: str) -> Tuple[str, str]:
+        return "token_ledger:balance:" + user_id, "token_ledger:reserved:" + user_id
+
+    async def _refresh(self, user_id: str, load_balance: BalanceLoader) -> None:
+        """user 서비스에서 잔량을 조회해 캐싱 (다른 pod가 먼저 채웠으면 그 값을 유지)"""
+        balance_key, _ = self._keys(user_id)
+        balance = await load_balance()
+        await self.redis.set(balance_key, int(balance), ex=self.ttl_seconds, nx=True)
+
+    async def available(self, user_id: str, load_balance: BalanceLoader) -> int:
+        """예약 중인 토큰을 제외한 사용 가능 잔량"""
+        keys = self._keys(user_id)
+        available = await self.redis.eval(_AVAILABLE_SCRIPT, 2, *keys)
+        if available is None:
+            await self._refresh(user_id, load_balance)
+            available = await self.redis.eval(_AVAILABLE_SCRIPT, 2, *keys)
+        return int(available or 0)
+
+    async def reserve(self, user_id: str, amount: int, load_balance: BalanceLoader) -> Tuple[bool, int]:
+        """
+        amount만큼 원자적으로 예약합니다.
+
+        Returns:
+            (예약 성공 여부, 예약 후 가용량 (실패 시 현재 가용량))
+        """
+        keys = self._keys(user_id)
+        for _ in range(2):
+            status, available = await self.redis.eval(_RESERVE_SCRIPT, 2, *keys, int(amount), self.reservation_ttl_seconds)
+            if status != -1:
+                return status == 1, int(available)
+            await self._refresh(user_id, load_balance)
+        return False, 0
+
+    async def reconcile(self, user_id: str, reserved: int, used: int) -> None:
+        """예약을 실제 사용량으로 정산"""
+        await self.redis.eval(_RECONCILE_SCRIPT, 2, *self._keys(user_id), int(reserved), int(used))
+
+    async def release(self, user_id: str, reserved: int) -> None:
+        """실패한 요청의 예약 해제 (사용량 0으로 정산)"""
+        await self.reconcile(user_id, reserved, 0)
+
+
+token_ledger = TokenLedger(
+    ttl_seconds=int(os.getenv("TOKEN_LEDGER_TTL", "30")),
+    reservation_ttl_seconds=int(os.getenv("TOKEN_LEDGER_RESERVATION_TTL", "600")),
+)
@@ -0,0 +1,209 @@
+"""
+트래픽이 많은(hot) namespace를 프로세스 메모리에 미러링하는 관리자.
+namespace별 접근 빈도를 지수 감쇠 카운터로 추적하고, 임계치를 넘으면 백그라운드에서
+원본(Pinecone)의 벡터/메타데이터를 한 번 가져와 NumpyVectorStore로 보관합니다.
+메모리 예산을 넘으면 접근 빈도가 낮은 미러부터 제거합니다.
+적재 전에 원본 통계로 크기를 추정해서 예산에 들어오지 않으면 가져오지 않고,
+적재 실패 / 예산 거절 시에는 ttl 동안 같은 namespace를 다시 시도하지 않습니다.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from core.vectorstores.numpy_vectorstore import NumpyVectorStore
+from core.vectorstores.vector_store import VectorStore
+
+load_dotenv()
+
+# NumpyVectorStore는 정규화 행렬 하나만 float32로 보관 (원본은 행별 norm으로 복원)
+_BYTES_PER_VALUE = 4
+
+
+def _field(obj: Any, key: str) -> Any:
+    """dict / Pinecone 응답 객체 모두에서 필드 조회"""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(key)
+    return getattr(obj, key, None)
+
+
+class HotNamespaceMirror:
+    def __init__(
+        self,
+        hot_threshold: float = 10.0,
+        half_life_seconds: float = 300,
+        memory_budget_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: float = 300,
+    ):
+        """
+        Args:
+            hot_threshold: 미러링을 시작하는 감쇠 접근 점수
+            half_life_seconds: 접근 점수 반감기
+            memory_budget_bytes: 전체 미러가 사용할 수 있는 메모리 예산
+            ttl_seconds: 미러를 최신으로 간주하는 시간 (지나면 원본으로 fallback 후 재적재)
+        """
+        self.hot_threshold = hot_threshold
+        self.half_life_seconds = half_life_seconds
+        self.memory_budget_bytes = memory_budget_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._scores: Dict[str, Tuple[float, float]] = {}  # namespace -> (score, updated_at)
+        self._mirrors: Dict[str, Tuple[NumpyVectorStore, float]] = {}  # namespace -> (store, loaded_at)
+        self._generations: Dict[str, int] = {}
+        self._loading: Set[str] = set()
+        self._failed_at: Dict[str, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _score(self, namespace: str, now: float) -> float:
+        score, updated_at = self._scores.get(namespace, (0.0, now))
+        return score * 0.5 ** ((now - updated_at) / self.half_life_seconds)
+
+    def record_access(self, namespace: str, primary: VectorStore) -> None:
+        """접근을 기록하고, hot namespace면 미러 적재를 예약"""
+        now = time.monotonic()
+        score = self._score(namespace, now) + 1.0
+        self._scores[namespace] = (score, now)
+
+        if score < self.hot_threshold or namespace in self._loading or self.get(namespace) is not None:
+            return
+        # 적재에 실패했거나 예산 때문에 거절된 namespace는 ttl 동안 재시도하지 않음
+        failed_at = self._failed_at.get(namespace)
+        if failed_at is not None and now - failed_at < self.ttl_seconds:
+            return
+
+        self._loading.add(namespace)
+        task = asyncio.create_task(self._load(namespace, primary))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def get(self, namespace: str) -> Optional[NumpyVectorStore]:
+        """최신 미러가 있으면 반환 (없거나 stale이면 None)"""
+        mirror = self._mirrors.get(namespace)
+        if mirror is None:
+            return None
+
+        store, loaded_at = mirror
+        if time.monotonic() - loaded_at > self.ttl_seconds:
+            del self._mirrors[namespace]
+            return None
+        return store
+
+    def lookup(self, namespace: str) -> Optional[NumpyVectorStore]:
+        store = self.get(namespace)
+        if store is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return store
+
+    def invalidate(self, namespace: str) -> None:
+        """원본이 변경되었을 때 미러 제거 (적재 중인 결과도 폐기)"""
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        self._mirrors.pop(namespace, None)
+        self._failed_at.pop(namespace, None)
+
+    async def _estimate_nbytes(self, namespace: str, primary: VectorStore) -> Optional[int]:
+        """원본 통계(벡터 수 x 차원)로 미러 크기 추정 (알 수 없으면 None)"""
+        try:
+            stats = await primary.stats()
+        except Exception as e:
+            print(f"[HotNamespaceMirror] failed to read stats for namespace '{namespace}': {e}")
+            return None
+        dimension = _field(stats, "dimension")
+        summary = _field(_field(stats, "namespaces"), namespace)
+        vector_count = _field(summary, "vector_count")
+        if not dimension or vector_count is None:
+            return None
+        return int(vector_count) * int(dimension) * _BYTES_PER_VALUE
+
+    def _reject(self, namespace: str, nbytes: int) -> None:
+        self._failed_at[namespace] = time.monotonic()
+        print(f"[HotNamespaceMirror] namespace '{namespace}' ({nbytes} bytes) does not fit the mirror budget")
+
+    async def _load(self, namespace: str, primary: VectorStore) -> None:
+        generation = self._generations.get(namespace, 0)
+        try:
+            # 예산에 들어오지 않을 namespace는 전체 fetch를 하지 않음
+            estimated = await self._estimate_nbytes(namespace, primary)
+            if estimated is not None and self._plan_eviction(namespace, estimated) is None:
+                self._reject(namespace, estimated)
+                return
+
+            vectors = await primary.fetch_all()
+            store = NumpyVectorStore(namespace=namespace)
+            await store.upsert_vectors(vectors)
+        except Exception as e:
+            print(f"[HotNamespaceMirror] failed to mirror namespace '{namespace}': {e}")
+            self._failed_at[namespace] = time.monotonic()
+            return
+        finally:
+            self._loading.discard(namespace)
+
+        if generation != self._generations.get(namespace, 0):
+            return
+        if not self._reserve(namespace, store.nbytes):
+            self._reject(namespace, store.nbytes)
+            return
+
+        self._mirrors[namespace] = (store, time.monotonic())
+        print(f"[HotNamespaceMirror] mirrored namespace '{namespace}' ({len(vectors)} vectors, {store.nbytes} bytes)")
+
+    def _used_bytes(self) -> int:
+        return sum(store.nbytes for store, _ in self._mirrors.values())
+
+    def _plan_eviction(self, namespace: str, nbytes: int) -> Optional[List[str]]:
+        """예산 안에 들어오기 위해 제거할 더 차가운 미러 목록. 불가능하면 None"""
+        if nbytes > self.memory_budget_bytes:
+            return None
+
+        now = time.monotonic()
+        score = self._score(namespace, now)
+        colder = sorted(
+            (self._score(ns, now), ns) for ns in self._mirrors if ns != namespace
+        )
+
+        used = self._used_bytes()
+        evict = []
+        for other_score, other in colder:
+            if used + nbytes <= self.memory_budget_bytes:
+                break
+            if other_score >= score:
+                return None
+            evict.append(other)
+            used -= self._mirrors[other][0].nbytes
+
+        if used + nbytes > self.memory_budget_bytes:
+            return None
+        return evict
+
+    def _reserve(self, namespace: str, nbytes: int) -> bool:
+        """예산 안에 들어오도록 더 차가운 미러를 제거. 불가능하면 False"""
+        evict = self._plan_eviction(namespace, nbytes)
+        if evict is None:
+            return False
+        for other in evict:
+            del self._mirrors[other]
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "mirrors": len(self._mirrors),
+            "used_bytes": self._used_bytes(),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+hot_namespace_mirror = HotNamespaceMirror(
+    hot_threshold=float(os.getenv("VECTOR_STORE_MIRROR_HOT_THRESHOLD", "10")),
+    half_life_seconds=float(os.getenv("VECTOR_STORE_MIRROR_HALF_LIFE", "300")),
+    memory_budget_bytes=int(os.getenv("VECTOR_STORE_MIRROR_BUDGET_MB", "256")) * 1024 * 1024,
+    ttl_seconds=float(os.getenv("VECTOR_STORE_MIRROR_TTL", "300")),
+)
@@ -0,0 +1,66 @@
+from typing import Any, Dict, List, Optional
+
+from core.embedder.embedder import Embedder
+from core.vectorstores.hot_namespace_mirror import HotNamespaceMirror
+from core.vectorstores.vector_store import VectorStore
+
+
+class MirroredVectorStore(VectorStore):
+    """
+    원본 vector store(Pinecone) 앞에 hot namespace 인메모리 미러를 두는 decorator.
+    검색은 최신 미러가 있으면 로컬에서 처리하고, 없거나 stale이면 원본으로 fallback 합니다.
+    쓰기/삭제는 항상 원본에 반영한 뒤 미러를 무효화합니다.
+    """
+
+    def __init__(self, primary: VectorStore, mirror: HotNamespaceMirror):
+        self.primary = primary
+        self.mirror = mirror
+        self.namespace = primary.namespace
+
+    async def upsert_documents(self, docs: list, embed_model: Embedder):
+        try:
+            await self.primary.upsert_documents(docs=docs, embed_model=embed_model)
+        finally:
+            self.mirror.invalidate(self.namespace)
+
+    async def upsert_vectors(self, vectors: List[Dict[str, Any]]):
+        try:
+            await self.primary.upsert_vectors(vectors)
+        finally:
+            self.mirror.invalidate(self.namespace)
+
+    async def query(self, text: str, embed_model: Embedder, top_k: int = 5):
+        vector = await embed_model.embed_query(text)
+        return await self.query_by_vector(vector=vector, top_k=top_k)
+
+    async def query_by_vector(
+        self,
+        vector: list,
+        top_k: int = 5,
+        filter: Optional[dict] = None,
+        include_values: bool = False,
+    ):
+        self.mirror.record_access(self.namespace, self.primary)
+
+        local = self.mirror.lookup(self.namespace)
+        if local is not None:
+            return await local.query_by_vector(vector=vector, top_k=top_k, filter=filter, include_values=include_values)
+        return await self.primary.query_by_vector(vector=vector, top_k=top_k, filter=filter, include_values=include_values)
+
+    async def fetch_all(self) -> List[Dict[str, Any]]:
+        return await self.primary.fetch_all()
+
+    async def delete_all(self):
+        try:
+            await self.primary.delete_all()
+        finally:
+            self.mirror.invalidate(self.namespace)
+
+    async def delete_by_ids(self, ids: list):
+        try:
+            await self.primary.delete_by_ids(ids)
+        finally:
+            self.mirror.invalidate(self.namespace)
+
+    async def stats(self):
+        return await self.primary.stats()
@@ -0,0 +1,52 @@
+from typing import List, Sequence
+
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def maximal_marginal_relevance(
+    query_embedding: Sequence[float] | np.ndarray,
+    embeddings: Sequence[Sequence[float]] | np.ndarray,
+    k: int = 5,
+    lambda_mult: float = 0.5,
+) -> List[int]:
+    """
+    후보 벡터들 중 MMR(Maximal Marginal Relevance) 기준으로 k개를 골라 인덱스를 반환합니다.
+    한 번 가져온 후보(fetch_k)에 대해 로컬에서 계산하므로 추가 네트워크 호출이 없습니다.
+
+    Args:
+        query_embedding: 쿼리 임베딩 (d,)
+        embeddings: 후보 임베딩 행렬 (n, d)
+        k: 선택할 개수
+        lambda_mult: 1에 가까울수록 관련도, 0에 가까울수록 다양성 우선
+
+    Returns:
+        선택된 후보 인덱스 리스트 (선택 순서)
+    """
+    candidates = np.asarray(embeddings, dtype=np.float32)
+    if candidates.ndim != 2 or candidates.shape[0] == 0 or k <= 0:
+        return []
+
+    candidates = _normalize(candidates)
+    query = _normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+
+    query_similarity = candidates @ query
+    k = min(k, candidates.shape[0])
+
+    selected = [int(np.argmax(query_similarity))]
+    # 각 후보와 이미 선택된 문서들 사이의 최대 유사도
+    max_selected_similarity = candidates @ candidates[selected[0]]
+
+    while len(selected) < k:
+        scores = lambda_mult * query_similarity - (1 - lambda_mult) * max_selected_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(max_selected_similarity, candidates @ candidates[best], out=max_selected_similarity)
+
+    return selected
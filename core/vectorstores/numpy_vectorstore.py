@@ -0,0 +1,258 @@
+"""
+NumPy 기반 인메모리 Vector Store.
+namespace 하나를 정규화된 float32 행렬 하나로 보관하고(선택적으로 디스크에 저장 후 memory-map),
+top-k / 메타데이터 필터를 벡터화된 내적으로 처리합니다. 네트워크 호출이 없어
+소규모 배포나 오프라인 벤치마크에서 PineconeVectorStore 대신 사용할 수 있습니다.
+"""
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from core.embedder.embedder import Embedder
+from core.vectorstores.vector_store import VectorMatch, VectorQueryResult, VectorStore
+
+
+def _match_condition(value: Any, condition: Any) -> bool:
+    if not isinstance(condition, dict):
+        return value == condition
+
+    for op, expected in condition.items():
+        if op == "$eq" and not value == expected:
+            return False
+        if op == "$ne" and not value != expected:
+            return False
+        if op == "$in" and value not in expected:
+            return False
+        if op == "$nin" and value in expected:
+            return False
+        if op in ("$gt", "$gte", "$lt", "$lte"):
+            if value is None:
+                return False
+            if op == "$gt" and not value > expected:
+                return False
+            if op == "$gte" and not value >= expected:
+                return False
+            if op == "$lt" and not value < expected:
+                return False
+            if op == "$lte" and not value <= expected:
+                return False
+    return True
+
+
+def match_filter(metadata: Dict[str, Any], filter: Optional[dict]) -> bool:
+    """Pinecone 메타데이터 필터 문법($eq, $ne, $in, $nin, $gt(e), $lt(e), $and, $or)을 평가"""
+    if not filter:
+        return True
+
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(match_filter(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(match_filter(metadata, sub) for sub in condition):
+                return False
+        elif not _match_condition(metadata.get(key), condition):
+            return False
+    return True
+
+
+class NumpyVectorStore(VectorStore):
+    def __init__(self, namespace: str, persist_dir: Optional[str] = None):
+        self.namespace = namespace
+        self.persist_dir = Path(persist_dir) if persist_dir else None
+
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        # (n, d) 정규화된 float32 행렬 (cosine 유사도 = 내적). 영속화하면 파일을 memory-map한 배열
+        self._matrix: np.ndarray = np.empty((0, 0), dtype=np.float32)
+        # 원본 벡터의 norm (include_values 응답 시 matrix * norm으로 원본 복원, 행렬 사본을 따로 두지 않음)
+        self._norms: np.ndarray = np.empty((0,), dtype=np.float32)
+        # 파일 쓰기가 스레드에서 진행되는 동안 다른 변경이 끼어들지 않도록 직렬화
+        self._write_lock = asyncio.Lock()
+
+        if self.persist_dir is not None:
+            self._load()
+
+    # ---- 영속화 (memory-map) ----
+    def _paths(self):
+        return (
+            self.persist_dir / f"{self.namespace}.matrix.npy",
+            self.persist_dir / f"{self.namespace}.norms.npy",
+            self.persist_dir / f"{self.namespace}.meta.json",
+        )
+
+    def _load(self) -> None:
+        matrix_path, norms_path, meta_path = self._paths()
+        if not meta_path.exists():
+            return
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        if matrix_path.exists() and norms_path.exists():
+            matrix = np.load(matrix_path, mmap_mode="r")
+            norms = np.load(norms_path)
+        else:
+            # 정규화 행렬 도입 전 형식 (원본 벡터만 저장). 다음 저장 시 새 형식으로 바뀜
+            values_path = self.persist_dir / f"{self.namespace}.values.npy"
+            if not values_path.exists():
+                return
+            matrix, norms = self._normalize(np.load(values_path))
+
+        self._ids = meta["ids"]
+        self._metadata = meta["metadata"]
+        self._matrix = matrix
+        self._norms = norms
+
+    @staticmethod
+    def _write(paths, matrix: np.ndarray, norms: np.ndarray, meta: Dict[str, Any]) -> np.ndarray:
+        """임시 파일에 쓰고 교체한 뒤 memory-map으로 다시 연 행렬을 반환 (스레드에서 실행)"""
+        matrix_path, norms_path, meta_path = paths
+        os.makedirs(matrix_path.parent, exist_ok=True)
+
+        # 기존 memory-map이 잘린 파일을 보지 않도록 임시 파일에 쓰고 교체
+        tmp_matrix_path = matrix_path.with_suffix(".tmp.npy")
+        np.save(tmp_matrix_path, matrix)
+        os.replace(tmp_matrix_path, matrix_path)
+
+        tmp_norms_path = norms_path.with_suffix(".tmp.npy")
+        np.save(tmp_norms_path, norms)
+        os.replace(tmp_norms_path, norms_path)
+
+        tmp_meta_path = meta_path.with_suffix(".tmp")
+        with open(tmp_meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_meta_path, meta_path)
+
+        return np.load(matrix_path, mmap_mode="r")
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray):
+        """(정규화된 행렬, 원본 norm)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1)
+        safe_norms = np.where(norms == 0, 1.0, norms)[:, None]
+        return np.ascontiguousarray(vectors / safe_norms, dtype=np.float32), norms.astype(np.float32)
+
+    async def _set_rows(self, ids: List[str], matrix: np.ndarray, norms: np.ndarray, metadata: List[Dict[str, Any]]) -> None:
+        self._ids = ids
+        self._metadata = metadata
+        self._matrix = matrix if len(ids) else np.empty((0, 0), dtype=np.float32)
+        self._norms = norms if len(ids) else np.empty((0,), dtype=np.float32)
+        if self.persist_dir is None:
+            return
+
+        # 파일 쓰기는 이벤트 루프를 막지 않도록 스레드에서 수행하고, 끝나면 RAM 사본 대신 memory-map을 사용
+        meta = {"ids": list(self._ids), "metadata": list(self._metadata)}
+        self._matrix = await asyncio.to_thread(self._write, self._paths(), self._matrix, self._norms, meta)
+
+    def _values(self, i: int) -> List[float]:
+        return (np.asarray(self._matrix[i]) * self._norms[i]).tolist()
+
+    # ---- VectorStore ----
+    async def upsert_documents(self, docs: list, embed_model: Embedder):
+        vectors = await embed_model.embed_documents(docs)
+        await self.upsert_vectors(vectors)
+
+    async def upsert_vectors(self, vectors: List[Dict[str, Any]]):
+        if not vectors:
+            return
+
+        new_matrix, new_norms = self._normalize(np.asarray([v["values"] for v in vectors], dtype=np.float32))
+        async with self._write_lock:
+            if len(self._ids) and new_matrix.shape[1] != self._matrix.shape[1]:
+                raise ValueError(
+                    f"벡터 차원이 다릅니다. namespace={self.namespace}, "
+                    f"기존: {self._matrix.shape[1]}, 입력: {new_matrix.shape[1]}"
+                )
+
+            new_ids = [str(v["id"]) for v in vectors]
+            replaced = set(new_ids)
+            keep = [i for i, vector_id in enumerate(self._ids) if vector_id not in replaced]
+
+            ids = [self._ids[i] for i in keep] + new_ids
+            metadata = [self._metadata[i] for i in keep] + [dict(v.get("metadata") or {}) for v in vectors]
+            if keep:
+                matrix = np.concatenate([np.asarray(self._matrix)[keep], new_matrix])
+                norms = np.concatenate([self._norms[keep], new_norms])
+            else:
+                matrix, norms = new_matrix, new_norms
+            await self._set_rows(ids, matrix, norms, metadata)
+
+    async def query(self, text: str, embed_model: Embedder, top_k: int = 5):
+        vector = await embed_model.embed_query(text)
+        return await self.query_by_vector(vector=vector, top_k=top_k)
+
+    async def query_by_vector(
+        self,
+        vector: list,
+        top_k: int = 5,
+        filter: Optional[dict] = None,
+        include_values: bool = False,
+    ) -> VectorQueryResult:
+        if not self._ids or top_k <= 0:
+            return VectorQueryResult()
+
+        query = np.asarray(vector, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        scores = self._matrix @ (query / query_norm if query_norm else query)
+
+        if filter:
+            mask = np.fromiter((match_filter(m, filter) for m in self._metadata), dtype=bool, count=len(self._ids))
+            scores = np.where(mask, scores, -np.inf)
+            candidates = int(mask.sum())
+        else:
+            candidates = len(self._ids)
+
+        k = min(top_k, candidates)
+        if k == 0:
+            return VectorQueryResult()
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return VectorQueryResult(matches=[
+            VectorMatch(
+                id=self._ids[i],
+                score=float(scores[i]),
+                values=self._values(i) if include_values else [],
+                metadata=dict(self._metadata[i]),
+            )
+            for i in top
+        ])
+
+    async def fetch_all(self) -> List[Dict[str, Any]]:
+        return [
+            {"id": vector_id, "values": self._values(i), "metadata": dict(self._metadata[i])}
+            for i, vector_id in enumerate(self._ids)
+        ]
+
+    @property
+    def nbytes(self) -> int:
+        """프로세스 메모리에 올라간 크기 (memory-map된 행렬은 페이지 캐시에 있으므로 제외)"""
+        matrix_bytes = 0 if isinstance(self._matrix, np.memmap) else self._matrix.nbytes
+        return int(matrix_bytes + self._norms.nbytes)
+
+    async def delete_all(self):
+        async with self._write_lock:
+            await self._set_rows([], np.empty((0, 0), dtype=np.float32), np.empty((0,), dtype=np.float32), [])
+
+    async def delete_by_ids(self, ids: list):
+        removed = set(str(i) for i in ids)
+        async with self._write_lock:
+            keep = [i for i, vector_id in enumerate(self._ids) if vector_id not in removed]
+            if len(keep) == len(self._ids):
+                return
+            matrix = np.asarray(self._matrix)[keep] if keep else np.empty((0, 0), dtype=np.float32)
+            await self._set_rows([self._ids[i] for i in keep], matrix, self._norms[keep], [self._metadata[i] for i in keep])
+
+    async def stats(self):
+        return {
+            "dimension": int(self._matrix.shape[1]) if len(self._ids) else 0,
+            "namespaces": {self.namespace: {"vector_count": len(self._ids)}},
+            "total_vector_count": len(self._ids),
+        }
@@ -0,0 +1,56 @@
+"""
+프로세스당 하나의 Pinecone 클라이언트 / 인덱스 핸들을 소유하고,
+namespace별 vector store 객체를 캐싱해 재사용하는 레지스트리.
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from dotenv import load_dotenv
+from pinecone import Pinecone
+
+load_dotenv()
+
+T = TypeVar("T")
+
+
+class PineconeRegistry:
+    def __init__(self, index_name: str, pool_threads: int = 8):
+        self.index_name = index_name
+        self.pool_threads = pool_threads
+        self._client: Optional[Pinecone] = None
+        self._index = None
+        self._stores: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get_client(self) -> Pinecone:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = Pinecone(api_key=os.getenv("PINECONE_API_KEY"), pool_threads=self.pool_threads)
+        return self._client
+
+    def get_index(self):
+        """커넥션 풀을 공유하는 인덱스 핸들 (TLS 핸드셰이크는 프로세스당 한 번)"""
+        if self._index is None:
+            client = self.get_client()
+            with self._lock:
+                if self._index is None:
+                    self._index = client.Index(self.index_name)
+        return self._index
+
+    def get_store(self, namespace: str, factory: Callable[[], T]) -> T:
+        """namespace별 store 객체를 캐싱해서 반환"""
+        store = self._stores.get(namespace)
+        if store is None:
+            store = self._stores.setdefault(namespace, factory())
+        return store
+
+    def evict_store(self, namespace: str) -> None:
+        self._stores.pop(namespace, None)
+
+
+pinecone_registry = PineconeRegistry(
+    index_name=os.getenv("PINECONE_INDEX_NAME", "paradox"),
+    pool_threads=int(os.getenv("PINECONE_MAX_WORKERS", "8")),
+)
@@ -1,61 +1,79 @@
-import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
 from dotenv import load_dotenv
-from pinecone import Pinecone
-from langchain_pinecone import PineconeVectorStore as LGPineconeVectorStore
 from core.embedder.embedder import Embedder
+from core.vectorstores.pinecone_registry import pinecone_registry
+from core.vectorstores.vector_store import VectorStore
 
 load_dotenv()
 
-class PineconeVectorStore:
+# Pinecone 동기 클라이언트 호출을 이벤트 루프 밖에서 실행하기 위한 bounded executor
+_pinecone_executor = ThreadPoolExecutor(
+    max_workers=pinecone_registry.pool_threads,
+    thread_name_prefix="pinecone",
+)
+
+
+class PineconeVectorStore(VectorStore):
     def __init__(self, namespace : str):
         self.namespace = namespace
-        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-        self.index_name = os.getenv("PINECONE_INDEX_NAME", "paradox")
-        self.index = pc.Index(self.index_name)
-        self.vectorstore = None
-
-    def _init_vectorstore(self, embedder: Embedder):
-        self.vectorstore = LGPineconeVectorStore(
-            index_name=self.index_name,
-            namespace=self.namespace,
-            embedding=embedder.emb
-        )
+        # 클라이언트 / 인덱스 핸들은 프로세스 전역에서 공유
+        self.index_name = pinecone_registry.index_name
+        self.index = pinecone_registry.get_index()
+
+    # 모든 Pinecone 데이터 플레인 호출은 여기를 거쳐 이벤트 루프를 막지 않음
+    async def _run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_pinecone_executor, partial(fn, *args, **kwargs))
 
     # upload pinecone
     async def upsert_documents(self, docs: list, embed_model : Embedder):
         vectors = await embed_model.embed_documents(docs)  # 또는 embed_documents
-        self.index.upsert(vectors=vectors, namespace=self.namespace)
+        await self.upsert_vectors(vectors)
+
+    async def upsert_vectors(self, vectors: list):
+        await self._run(self.index.upsert, vectors=vectors, namespace=self.namespace)
 
     # search pinecone
     async def query(self, text: str, embed_model : Embedder, top_k: int = 5):
         vector = await embed_model.embed_query(text)
-        results = self.index.query(
+        return await self.query_by_vector(vector=vector, top_k=top_k)
+
+    # search pinecone by vector (include_values=True면 후보 벡터도 함께 반환)
+    async def query_by_vector(self, vector: list, top_k: int = 5, filter: dict = None, include_values: bool = False):
+        results = await self._run(
+            self.index.query,
             vector=vector,
             top_k=top_k,
             namespace=self.namespace,
-            include_metadata=True
+            filter=filter,
+            include_metadata=True,
+            include_values=include_values
         )
         return results
 
+    # namespace 전체 벡터 조회 (list로 id 페이지를 받아 fetch)
+    async def fetch_all(self, batch_size: int = 100) -> list:
+        def _fetch_all() -> list:
+            vectors = []
+            for ids in self.index.list(namespace=self.namespace, limit=batch_size):
+                response = self.index.fetch(ids=ids, namespace=self.namespace)
+                for vector in response.vectors.values():
+                    vectors.append({"id": vector.id, "values": vector.values, "metadata": vector.metadata or {}})
+            return vectors
+
+        return await self._run(_fetch_all)
+
     # delete all
     async def delete_all(self):
-        self.index.delete(delete_all=True, namespace=self.namespace)
+        await self._run(self.index.delete, delete_all=True, namespace=self.namespace)
 
     # delete by ids
     async def delete_by_ids(self, ids: list):
-        self.index.delete(ids=ids, namespace=self.namespace)
+        await self._run(self.index.delete, ids=ids, namespace=self.namespace)
 
     async def stats(self):
-        return self.index.describe_index_stats()
-
-    def build_retriever(self, identity: str, embed_model: Embedder, top_k : int = 5):
-        retriever = self.vectorstore.as_retriever(
-            search_type="mmr",
-            search_kwargs={
-                "k": top_k,
-                "filter": {"source": {"$eq": identity}}
-            },
-        )
-        return retriever
-
-
+        return await self._run(self.index.describe_index_stats)
@@ -0,0 +1,73 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from core.embedder.embedder import Embedder
+
+
+@dataclass
+class VectorMatch:
+    id: str
+    score: float
+    values: List[float] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class VectorQueryResult:
+    matches: List[VectorMatch] = field(default_factory=list)
+
+
+class VectorStore(ABC):
+    """
+    Vector Store 인터페이스 (Adapter 패턴의 Target Interface)
+
+    namespace 하나에 대한 upsert / 검색 / 삭제를 정의합니다.
+    Pinecone, 인메모리(NumPy) 등 구현체를 교체해서 사용할 수 있습니다.
+    검색 결과는 Pinecone QueryResponse와 같은 형태(.matches[].id/score/values/metadata)를 따릅니다.
+    """
+
+    namespace: str
+
+    @abstractmethod
+    async def upsert_documents(self, docs: list, embed_model: Embedder):
+        """문서를 임베딩해서 저장합니다."""
+        pass
+
+    @abstractmethod
+    async def upsert_vectors(self, vectors: List[Dict[str, Any]]):
+        """이미 임베딩된 벡터({"id", "values", "metadata"})를 저장합니다."""
+        pass
+
+    @abstractmethod
+    async def query(self, text: str, embed_model: Embedder, top_k: int = 5):
+        """텍스트를 임베딩해서 검색합니다."""
+        pass
+
+    @abstractmethod
+    async def query_by_vector(
+        self,
+        vector: list,
+        top_k: int = 5,
+        filter: Optional[dict] = None,
+        include_values: bool = False,
+    ):
+        """벡터로 검색합니다. include_values=True면 후보 벡터도 함께 반환합니다."""
+        pass
+
+    @abstractmethod
+    async def fetch_all(self) -> List[Dict[str, Any]]:
+        """namespace의 모든 벡터({"id", "values", "metadata"})를 가져옵니다."""
+        pass
+
+    @abstractmethod
+    async def delete_all(self):
+        pass
+
+    @abstractmethod
+    async def delete_by_ids(self, ids: list):
+        pass
+
+    @abstractmethod
+    async def stats(self):
+        pass
@@ -0,0 +1,39 @@
+import os
+from typing import Dict
+
+from dotenv import load_dotenv
+
+from core.vectorstores.hot_namespace_mirror import hot_namespace_mirror
+from core.vectorstores.mirrored_vectorstore import MirroredVectorStore
+from core.vectorstores.numpy_vectorstore import NumpyVectorStore
+from core.vectorstores.pinecone_registry import pinecone_registry
+from core.vectorstores.pinecone_vectorstore import PineconeVectorStore
+from core.vectorstores.vector_store import VectorStore
+
+load_dotenv()
+
+# VECTOR_STORE_BACKEND: pinecone (기본) | numpy (인메모리, VECTOR_STORE_DIR 지정 시 디스크 memory-map)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone")
+# VECTOR_STORE_MIRROR: pinecone 백엔드에서 hot namespace 인메모리 미러 사용 여부
+VECTOR_STORE_MIRROR = os.getenv("VECTOR_STORE_MIRROR", "true").lower() == "true"
+
+_numpy_stores: Dict[str, NumpyVectorStore] = {}
+
+
+def get_vector_store(namespace: str) -> VectorStore:
+    """설정된 백엔드의 namespace별 vector store를 캐싱해서 반환"""
+    if VECTOR_STORE_BACKEND == "numpy":
+        store = _numpy_stores.get(namespace)
+        if store is None:
+            store = _numpy_stores.setdefault(
+                namespace,
+                NumpyVectorStore(namespace=namespace, persist_dir=os.getenv("VECTOR_STORE_DIR")),
+            )
+        return store
+
+    if VECTOR_STORE_MIRROR:
+        return pinecone_registry.get_store(
+            namespace,
+            lambda: MirroredVectorStore(PineconeVectorStore(namespace=namespace), hot_namespace_mirror),
+        )
+    return pinecone_registry.get_store(namespace, lambda: PineconeVectorStore(namespace=namespace))
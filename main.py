@@ -3,14 +3,23 @@ from fastapi import FastAPI, Request
 from starlette.middleware.cors import CORSMiddleware
 from starlette.responses import JSONResponse
 from api import api_router
+from app.chat_history.repository.chat_history_write_buffer import chat_history_write_buffer
 from core.db.mongo_db import init_mongodb, close_mongodb
+from core.db.redis_db import close_redis
+from core.grpcs.channels import init_grpc_channels, close_grpc_channels
 from core.exceptions.business_exception import BusinessException
 
 @asynccontextmanager
 async def lifespan(app : FastAPI):
     await init_mongodb(app)
+    chat_history_write_buffer.start()
+    init_grpc_channels()
     yield
+    # 버퍼에 남은 chat_history를 저장한 뒤 Mongo 연결 종료
+    await chat_history_write_buffer.close()
     await close_mongodb(app)
+    await close_redis()
+    await close_grpc_channels()
 
 
 app = FastAPI(lifespan=lifespan)